@@ -0,0 +1,91 @@
+import logging
+import numpy as np
+import pandas as pd
+from matching import has_space, score_matrix, top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOP_ADOPTERS = 10
+# Largest block of the pets x adopters score matrix held at once, in cells
+CHUNK_CELLS = 1_000_000
+
+# What calculate_match reads from each side; rows that agree on these score the same
+PET_SIGNATURE_COLUMNS = ["species", "gender", "activity_level", "allergy_friendly", "special_needs"]
+ADOPTER_SIGNATURE_COLUMNS = ["pref_species", "pref_gender", "activity_level", "allergy_friendly", "has_space"]
+
+
+# Group rows by signature: a group code per row and the position of each group's first row
+def _signature_groups(df, columns):
+    codes = df[columns].groupby(columns, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+    _, first_positions = np.unique(codes, return_index=True)
+    return codes, first_positions
+
+
+def _pet_signatures(pets_df):
+    signatures = pd.DataFrame({column: pets_df[column] for column in PET_SIGNATURE_COLUMNS if column in pets_df.columns})
+    if "special_needs" in signatures.columns:
+        signatures["special_needs"] = pets_df["special_needs"].to_numpy(dtype=object).astype(bool)
+    else:
+        signatures["special_needs"] = False
+    return signatures
+
+
+def _adopter_signatures(adopters_df):
+    signatures = adopters_df[ADOPTER_SIGNATURE_COLUMNS[:-1]].copy()
+    # House, garden and apartment size only count together, as room for an active pet
+    signatures["has_space"] = has_space(adopters_df)
+    return signatures
+
+
+# Score matrix between the given pet and adopter rows, computed a chunk of pets at a time
+def _chunked_score_matrix(pets_df, adopters_df, chunk_cells=CHUNK_CELLS):
+    rows = max(1, chunk_cells // max(1, len(adopters_df)))
+    return np.vstack([score_matrix(pets_df.iloc[start:start + rows], adopters_df) for start in range(0, len(pets_df), rows)])
+
+
+# Positions of the adopters who already liked or skipped each pet
+def _excluded_adopters(interactions_df, adopters_df, pet_ids):
+    if interactions_df.empty:
+        return {}
+    rows = interactions_df[interactions_df["pet_id"].isin(pet_ids)]
+    positions = pd.Index(adopters_df["adopter_id"]).get_indexer(rows["adopter_id"])
+    excluded = {}
+    for pet_id, pos in zip(rows["pet_id"], positions):
+        if pos >= 0:
+            excluded.setdefault(pet_id, set()).add(pos)
+    return excluded
+
+
+# Rank adopters for each pet in pets_df: {pet_id: [(adopter_id, score), ...]}, best first,
+# leaving out adopters who already liked or skipped the pet. k=None ranks every adopter.
+#
+# Scores only depend on a few attributes on each side, so pets and adopters are grouped by
+# those first and the pets x adopters score matrix is computed between the groups, in chunks.
+# Each pet group then spreads its scores over all adopters once and takes its best rows with a
+# partial sort; ties keep the adopters' table order, as top_k() does for pets.
+def rank_adopters(pets_df, adopters_df, interactions_df, k=DEFAULT_TOP_ADOPTERS, chunk_cells=CHUNK_CELLS):
+    if pets_df.empty:
+        return {}
+    if adopters_df.empty:
+        return {pet_id: [] for pet_id in pets_df["pet_id"]}
+    pet_codes, pet_firsts = _signature_groups(_pet_signatures(pets_df), PET_SIGNATURE_COLUMNS)
+    adopter_codes, adopter_firsts = _signature_groups(_adopter_signatures(adopters_df), ADOPTER_SIGNATURE_COLUMNS)
+    group_scores = _chunked_score_matrix(pets_df.iloc[pet_firsts], adopters_df.iloc[adopter_firsts], chunk_cells)
+
+    pet_ids = pets_df["pet_id"].to_numpy(dtype=object)
+    adopter_ids = adopters_df["adopter_id"].to_numpy(dtype=object)
+    excluded = _excluded_adopters(interactions_df, adopters_df, pet_ids)
+    pets_by_group = pd.Series(np.arange(len(pet_codes))).groupby(pet_codes).indices
+
+    ranked = {}
+    for group, pet_positions in pets_by_group.items():
+        scores = group_scores[group][adopter_codes]
+        # Enough rows that every pet in the group still has k after its own exclusions
+        most_excluded = max(len(excluded.get(pet_ids[pos], ())) for pos in pet_positions)
+        best = top_k(scores, None if k is None else k + most_excluded)
+        for pos in pet_positions:
+            pet_excluded = excluded.get(pet_ids[pos], ())
+            positions = [adopter for adopter in best if adopter not in pet_excluded][:k]
+            ranked[pet_ids[pos]] = [(adopter_ids[adopter], float(scores[adopter])) for adopter in positions]
+    logger.info(f"Ranked {len(adopters_df)} adopters for {len(pets_df)} pets in {len(pets_by_group)} signature groups")
+    return ranked
@@ -1,6 +1,13 @@
 import streamlit as st
 import pandas as pd
+import io
+import numpy as np
 import logging
+import os
+from matching import score_pets, top_k
+from http_cache import DEFAULT_CACHE_MB as HTTP_CACHE_MB, DEFAULT_TTL_SECONDS as HTTP_TTL_SECONDS, get_http_cache
+from local_images import DEFAULT_CACHE_MB as LOCAL_IMAGE_CACHE_MB, DEFAULT_WARM_COUNT, get_local_image_provider
+from snapshot_cache import DEFAULT_SNAPSHOT_DIR, SnapshotCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -16,24 +23,85 @@ if "recommended_pets" not in st.session_state:
 if "skipped_pets" not in st.session_state:
     st.session_state.skipped_pets = []
 
+# app.py also runs without a secrets file; every section then uses its defaults
+def app_config(section):
+    try:
+        return st.secrets.get(section, {})
+    except FileNotFoundError:
+        return {}
+
 # GitHub repository details (replace 'yourusername' with your actual GitHub username)
 GITHUB_USERNAME = "MaximilianGrosse"  # Replace with your GitHub username
 REPO_NAME = "dog_shelter_streamlit"
 BRANCH = "main"
-CSV_URL = f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{REPO_NAME}/{BRANCH}/pets.csv"
-IMAGE_BASE_URL = f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{REPO_NAME}/{BRANCH}/"
+# [github] raw_base_url points the app at another server, e.g. a local stand-in
+RAW_BASE_URL = app_config("github").get("raw_base_url", f"https://raw.githubusercontent.com/{GITHUB_USERNAME}/{REPO_NAME}/{BRANCH}/")
+CSV_URL = f"{RAW_BASE_URL}pets.csv"
+IMAGE_BASE_URL = RAW_BASE_URL
+# Width photos are shown at on the recommendation cards
+IMAGE_DISPLAY_WIDTH = 300
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Bundled copy of the catalog, used when GitHub can't be reached
+BUNDLED_PETS_PATH = os.path.join(APP_DIR, "pets.csv")
+# How old the local pet snapshot may get before a background refresh from GitHub
+SNAPSHOT_REFRESH_SECONDS = 300
+
+# Catalog and photo downloads, shared by all sessions and revalidated after the TTL
+http_config = app_config("http_cache")
+http_cache = get_http_cache(
+    ttl_seconds=http_config.get("ttl_seconds", HTTP_TTL_SECONDS),
+    cache_mb=http_config.get("cache_mb", HTTP_CACHE_MB)
+)
+
+# Bundled photos, served from memory at the width they are shown at
+image_config = app_config("local_images")
+image_provider = get_local_image_provider(APP_DIR, cache_mb=image_config.get("cache_mb", LOCAL_IMAGE_CACHE_MB))
+IMAGE_WARM_COUNT = image_config.get("warm_count", DEFAULT_WARM_COUNT)
+
+# Photo bytes from the bundled pet_pics/, or from GitHub through the HTTP cache for photos this checkout lacks
+def get_image(image_path, display_width):
+    if image_provider.has(image_path):
+        return image_provider.get(image_path, display_width)
+    return http_cache.get(f"{IMAGE_BASE_URL}{image_path}")
 
-# Load pet data from GitHub
+# Local copy of the pet catalog, so a new process renders at once and works while GitHub is unreachable
+@st.cache_resource
+def get_pets_snapshot():
+    return SnapshotCache(os.path.join(app_config("cache").get("snapshot_dir", DEFAULT_SNAPSHOT_DIR), "app"))
+
+# Parse and validate the catalog CSV
+def read_pets(body):
+    pets_df = pd.read_csv(io.BytesIO(body))
+    required_columns = ["pet_id", "species", "breed", "gender", "name", "activity_level", "age", "allergy_friendly"]
+    if pets_df.empty or not all(col in pets_df.columns for col in required_columns):
+        raise ValueError("Pets DataFrame is empty or missing required columns")
+    logger.info(f"Successfully loaded pets data with {len(pets_df)} rows")
+    return pets_df
+
+# Reruns reuse the parsed catalog until its bytes change
+@st.cache_data(max_entries=2, show_spinner=False)
+def parse_pets(body):
+    return read_pets(body)
+
+# Load pet data through the HTTP cache. A new process renders from the local snapshot
+# while the catalog downloads; the snapshot is refreshed from GitHub in the background.
 def load_pets():
+    pets_snapshot = get_pets_snapshot()
+    age = pets_snapshot.age()
+    if CSV_URL not in http_cache or age is None or age > SNAPSHOT_REFRESH_SECONDS:
+        # No bundled fallback here, and the cache never hands the bundled copy to callers without one,
+        # so the snapshot only ever holds data from GitHub
+        pets_snapshot.refresh(lambda: {"pets": read_pets(http_cache.get(CSV_URL))})
+    if CSV_URL not in http_cache:
+        saved = pets_snapshot.read()
+        if saved is not None:
+            return saved["pets"]
     try:
-        pets_df = pd.read_csv(CSV_URL)
-        required_columns = ["pet_id", "species", "breed", "gender", "name", "activity_level", "age", "allergy_friendly"]
-        if pets_df.empty or not all(col in pets_df.columns for col in required_columns):
-            logger.error("Pets DataFrame is empty or missing required columns")
-            st.error("Pet data is missing or malformed. Please check the pets.csv file on GitHub.")
-            return pd.DataFrame()
-        logger.info(f"Successfully loaded pets data with {len(pets_df)} rows")
-        return pets_df
+        return parse_pets(http_cache.get(CSV_URL, BUNDLED_PETS_PATH))
+    except ValueError as e:
+        logger.error(str(e))
+        st.error("Pet data is missing or malformed. Please check the pets.csv file on GitHub.")
+        return pd.DataFrame()
     except Exception as e:
         logger.error(f"Failed to load pets data from GitHub: {str(e)}")
         st.error(f"Error loading pet data from GitHub: {str(e)}")
@@ -41,36 +109,14 @@ def load_pets():
 
 pets_df = load_pets()
 
-# Calculate match score between user and pet
-def calculate_match(user_data, pet):
-    score = 0
-    if user_data["pref_species"] == pet["species"]:
-        score += 0.3
-    if user_data["pref_gender"] in [pet["gender"], "Any"]:
-        score += 0.1
-    activity_levels = {"High": 3, "Medium": 2, "Low": 1}
-    if activity_levels.get(user_data["activity_level"], 0) >= activity_levels.get(pet["activity_level"], 0):
-        score += 0.2
-    if user_data["allergy_friendly"] == "Yes" and pet["allergy_friendly"] == "Yes":
-        score += 0.2
-    space_suitable = False
-    apartment_size = float(user_data["apartment_size"]) if user_data["apartment_size"] and str(user_data["apartment_size"]).strip() else 0
-    if pet["activity_level"] == "Low" or (user_data["house"] == "Yes" or user_data["garden"] == "Yes") or apartment_size >= 50:
-        space_suitable = True
-    if space_suitable and not pet.get("special_needs", ""):
-        score += 0.2
-    return score
-
 # Get pet recommendations
 def get_recommendations(user_data):
-    scores = []
+    if pets_df.empty:
+        return []
     skipped_pets = st.session_state.skipped_pets
-    for _, pet in pets_df.iterrows():
-        if pet["pet_id"] not in skipped_pets:
-            score = calculate_match(user_data, pet)
-            scores.append((pet["pet_id"], score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    recommended_pets = [pets_df[pets_df["pet_id"] == pet_id].iloc[0] for pet_id, _ in scores]
+    candidates = np.flatnonzero(~pets_df["pet_id"].isin(skipped_pets).to_numpy())
+    scores = score_pets(user_data, pets_df.iloc[candidates])
+    recommended_pets = [pets_df.iloc[pos] for pos in candidates[top_k(scores)]]
     return recommended_pets
 
 # Main app
@@ -113,6 +159,8 @@ if st.session_state.user_data is None:
                     "apartment_size": apartment_size
                 }
                 st.session_state.recommended_pets = get_recommendations(st.session_state.user_data)
+                # Have the first cards' photos in memory before they are shown
+                image_provider.warm([pet.get("image_path", "") for pet in st.session_state.recommended_pets[:IMAGE_WARM_COUNT]], IMAGE_DISPLAY_WIDTH)
                 st.session_state.recommendation_index = 0
                 st.session_state.skipped_pets = []
                 st.rerun()
@@ -131,8 +179,11 @@ if st.session_state.user_data is not None:
             with col1:
                 image_path = pet.get("image_path", "")
                 if image_path:
-                    image_url = f"{IMAGE_BASE_URL}{image_path}"
-                    st.image(image_url, caption=pet["name"], width=300)
+                    try:
+                        st.image(get_image(image_path, IMAGE_DISPLAY_WIDTH), caption=pet["name"], width=IMAGE_DISPLAY_WIDTH)
+                    except Exception as e:
+                        logger.warning(f"Failed to load image {image_path}: {e}")
+                        st.write("No image available")
                 else:
                     st.write("No image available")
             with col2:
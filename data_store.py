@@ -0,0 +1,404 @@
+import streamlit as st
+import pandas as pd
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from indexes import ShelterPartitions, build_pet_index, fill_pet_shelter_ids
+from interactions import INTERACTION_COLUMNS, build_interaction_index
+from rate_limit import BACKGROUND, INTERACTIVE, background_priority, current_priority
+from schema import apply_schema
+from sheet_writes import TABLE_KEYS, ChangeSet, cell_text
+from snapshot_cache import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+# How soon a read-only snapshot served while storage is unreachable tries storage again
+OFFLINE_RETRY_SECONDS = 30
+# Concurrent requests while loading the sheets, and attempts per request
+FETCH_WORKERS = 4
+MAX_FETCH_RETRIES = 3
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+TABLES = ["pets", "adopters", "shelters", "interactions"]
+# Tables that must have rows for a load to count as successful
+REQUIRED_TABLES = ["pets", "adopters", "shelters"]
+
+# read_only marks a snapshot served from the local copy instead of storage; writes wait for a live one
+Snapshot = namedtuple("Snapshot", TABLES + ["pet_index", "interaction_index", "shelter_partitions", "version", "loaded_at", "read_only"])
+
+
+# One empty frame per table, returned when a load fails
+def empty_tables():
+    return {table: pd.DataFrame() for table in TABLES}
+
+
+# The table frames of a snapshot, by name
+def snapshot_tables(snapshot):
+    return {table: getattr(snapshot, table) for table in TABLES}
+
+
+# Error code and message of a gspread APIError
+def _api_error_code(api_err):
+    return getattr(api_err, "code", None) or getattr(api_err.response, "status_code", None)
+
+
+def _api_error_message(api_err):
+    return getattr(api_err, "error", {}).get("message", str(api_err))
+
+
+# Run one Sheets request, retrying rate limits and server errors with exponential backoff.
+# Each request retries on its own, so one throttled sheet doesn't hold up the others.
+def _with_retry(request, description):
+    import gspread
+    for attempt in range(MAX_FETCH_RETRIES):
+        try:
+            return request()
+        except gspread.exceptions.APIError as api_err:
+            code = _api_error_code(api_err)
+            if code not in RETRYABLE_STATUS or attempt == MAX_FETCH_RETRIES - 1:
+                raise
+            logger.warning(f"{description} failed with {code} on attempt {attempt + 1}, retrying...")
+        except (ConnectionError, TimeoutError) as conn_err:
+            if attempt == MAX_FETCH_RETRIES - 1:
+                raise
+            logger.warning(f"{description} failed on attempt {attempt + 1}: {conn_err}, retrying...")
+        # Jitter keeps concurrent retries from hitting the quota at the same moment
+        time.sleep(2 ** attempt + random.random())
+
+
+# Open one table's spreadsheet and read its first worksheet; runs on the fetch pool.
+# The pool's threads don't share the caller's thread-local priority, so it is passed in.
+def _fetch_table(gc, sheet_name, sheet_id, priority=INTERACTIVE):
+    with (background_priority() if priority == BACKGROUND else nullcontext()):
+        return _read_table(gc, sheet_name, sheet_id)
+
+
+def _read_table(gc, sheet_name, sheet_id):
+    spreadsheet = _with_retry(lambda: gc.open_by_key(sheet_id), f"Opening {sheet_name} sheet")
+    worksheet = _with_retry(lambda: spreadsheet.sheet1, f"Opening {sheet_name} worksheet")
+    logger.info(f"Successfully accessed {sheet_name} sheet (ID: {sheet_id})")
+    # Fetch raw data as a list of lists to inspect
+    raw_data = _with_retry(worksheet.get_all_values, f"Fetching {sheet_name} data")
+    if not raw_data and sheet_name == "interactions":
+        # A brand-new interactions sheet; SheetsBackend migrates into it
+        raw_data = [INTERACTION_COLUMNS]
+    if not raw_data:
+        raise ValueError(f"No data found in {sheet_name} sheet")
+    # Convert to DataFrame manually to handle encoding
+    headers = raw_data[0]
+    data = raw_data[1:]
+    df = pd.DataFrame(data, columns=headers)
+    logger.info(f"Successfully loaded {sheet_name} data with {len(df)} rows")
+    return df
+
+
+# Spreadsheet id of every table, from the [gcp] secrets section
+def sheet_ids():
+    return {
+        "pets": st.secrets["gcp"]["sheets_pets_id"],
+        "adopters": st.secrets["gcp"]["sheets_adopters_id"],
+        "shelters": st.secrets["gcp"]["sheets_shelters_id"],
+        "interactions": st.secrets["gcp"]["sheets_interactions_id"]
+    }
+
+
+# Load the given tables from Google Sheets, fetching them concurrently
+def fetch_tables(gc, tables=TABLES):
+    import gspread
+    try:
+        sheet_configs = {table: sheet_id for table, sheet_id in sheet_ids().items() if table in tables}
+
+        dataframes = {}
+        priority = current_priority()
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="sheet-fetch") as pool:
+            futures = {
+                sheet_name: pool.submit(_fetch_table, gc, sheet_name, sheet_id, priority)
+                for sheet_name, sheet_id in sheet_configs.items()
+            }
+            # Streamlit calls only work on this thread, so failures are reported here
+            for sheet_name, future in futures.items():
+                sheet_id = sheet_configs[sheet_name]
+                try:
+                    dataframes[sheet_name] = future.result()
+                    continue
+                except gspread.exceptions.SpreadsheetNotFound as snf_err:
+                    logger.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}): {str(snf_err)}")
+                    st.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}). Please check the Sheet ID and permissions.")
+                except gspread.exceptions.APIError as api_err:
+                    logger.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {_api_error_message(api_err)}")
+                    st.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {_api_error_message(api_err)}")
+                except gspread.exceptions.WorksheetNotFound:
+                    raise
+                except Exception as e:
+                    logger.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
+                    st.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
+                for pending in futures.values():
+                    pending.cancel()
+                return empty_tables()
+
+        # Validate column existence
+        required_columns = {
+            "pets": ["pet_id", "species", "breed", "gender", "name"],
+            "adopters": ["adopter_id", "username", "password", "name"],
+            "shelters": ["shelter_id", "username", "password", "name"],
+            "interactions": INTERACTION_COLUMNS
+        }
+        for df_name, df in dataframes.items():
+            if (df_name in REQUIRED_TABLES and df.empty) or not all(col in df.columns for col in required_columns[df_name]):
+                logger.error(f"{df_name.capitalize()} DataFrame is empty or missing columns: {required_columns[df_name]}")
+                st.error(f"{df_name.capitalize()} data is missing or malformed. Please check the Google Sheet.")
+                return empty_tables()
+        
+        logger.info("Data loaded successfully from Google Sheets")
+        return dataframes
+    except gspread.exceptions.APIError as api_err:
+        logger.error(f"API Error loading data from Google Sheets: {_api_error_message(api_err)}")
+        st.error(f"API Error loading data from Google Sheets: {_api_error_message(api_err)}")
+        return empty_tables()
+    except gspread.exceptions.WorksheetNotFound as wnf_err:
+        logger.error(f"Worksheet not found: {str(wnf_err)}")
+        st.error(f"Worksheet not found in Google Sheet. Ensure the tab is named 'Sheet1': {str(wnf_err)}")
+        return empty_tables()
+    except Exception as e:
+        logger.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
+        st.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
+        return empty_tables()
+
+
+# Return a copy of a cached table with one table's ChangeSet entries applied.
+# Changed cells go in as text and the touched columns are typed again at the end.
+def _apply_table_changes(table, changes, cached_df, frame):
+    key_column = TABLE_KEYS[table]
+    df = cached_df.copy()
+    dirty_columns = set().union(*changes.updated[table].values()) & set(df.columns)
+    for column in dirty_columns:
+        df[column] = df[column].astype(object)
+
+    keys = list(changes.updated[table])
+    cached_rows = pd.Index(df[key_column]).get_indexer(keys)
+    frame_rows = pd.Index(frame[key_column]).get_indexer(keys)
+    for key, cached_pos, frame_pos in zip(keys, cached_rows, frame_rows):
+        if cached_pos < 0 or frame_pos < 0:
+            continue
+        for column in changes.updated[table][key]:
+            if column in df.columns:
+                df.iat[cached_pos, df.columns.get_loc(column)] = cell_text(frame.iat[frame_pos, frame.columns.get_loc(column)])
+
+    if changes.deleted[table]:
+        df = df[~df[key_column].isin(changes.deleted[table])].reset_index(drop=True)
+
+    if changes.appended[table]:
+        # A reload may already have brought in rows that were written before it
+        appended = set(changes.appended[table]) - set(df[key_column])
+        new_rows = frame[frame[key_column].isin(appended)].reindex(columns=df.columns)
+        new_rows = new_rows.apply(lambda column: column.map(cell_text))
+        df = pd.concat([df, new_rows], ignore_index=True)
+    return apply_schema(table, df)
+
+
+# Process-wide cache of the tables, shared by every page and session.
+# Snapshots are reused until the TTL runs out or a write calls invalidate();
+# each snapshot whose tables changed gets a higher version so sessions can spot stale views.
+# With a SnapshotCache, every successful load is also saved to disk: a new process renders
+# from that copy at once while the first load runs in the background, and when storage
+# can't be reached the last good tables are served read-only.
+class DataStore:
+    def __init__(self, loader, ttl_seconds=DEFAULT_TTL_SECONDS, snapshot_cache=None):
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_cache = snapshot_cache
+        self.version = 0
+        self._snapshot = None
+        self._refreshing = False
+        self._load_hooks = []
+        self._change_hooks = []
+        self._interaction_overlays = []
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return False
+        # A read-only snapshot stays in use while the background load runs, and is retried sooner otherwise
+        if snapshot.read_only and self._refreshing:
+            return True
+        ttl_seconds = min(self.ttl_seconds, OFFLINE_RETRY_SECONDS) if snapshot.read_only else self.ttl_seconds
+        return time.monotonic() - snapshot.loaded_at < ttl_seconds
+
+    def _build(self, tables, read_only=False):
+        for hook in self._load_hooks:
+            tables = hook(tables)
+        tables = {**tables, "pets": fill_pet_shelter_ids(tables["pets"], tables["shelters"])}
+        tables = {table: apply_schema(table, df) for table, df in tables.items()}
+        previous = self._snapshot
+        if previous is not None and all(getattr(previous, table).equals(df) for table, df in tables.items()):
+            # Nothing changed since the last load; keeping the version keeps derived state valid
+            return previous._replace(loaded_at=time.monotonic(), read_only=read_only)
+        self.version += 1
+        interaction_index = build_interaction_index(tables["interactions"])
+        for overlay in self._interaction_overlays:
+            pending = overlay()
+            if not pending.empty:
+                interaction_index = interaction_index.with_changes(pending)
+        return Snapshot(
+            **tables,
+            pet_index=build_pet_index(tables["pets"]),
+            interaction_index=interaction_index,
+            shelter_partitions=ShelterPartitions.build(tables["pets"], tables["shelters"]),
+            version=self.version,
+            loaded_at=time.monotonic(),
+            read_only=read_only
+        )
+
+    # The tables saved by the last successful load, or None
+    def _saved_snapshot(self):
+        if self.snapshot_cache is None:
+            return None
+        tables = self.snapshot_cache.read()
+        if tables is None or set(tables) != set(TABLES) or any(tables[table].empty for table in REQUIRED_TABLES):
+            return None
+        return self._build(tables, read_only=True)
+
+    # Load from storage; call with the lock held
+    def _load(self):
+        tables = self.loader()
+        # Failed loads come back empty
+        if any(tables[table].empty for table in REQUIRED_TABLES):
+            if self._snapshot is not None:
+                fallback = self._snapshot._replace(loaded_at=time.monotonic(), read_only=True)
+            else:
+                fallback = self._saved_snapshot()
+            if fallback is None:
+                # Nothing to fall back on; hand the empty tables out but don't keep them
+                self._snapshot = None
+                return self._build(tables)
+            logger.warning("Storage is unreachable, serving the last loaded data read-only")
+            self._snapshot = fallback
+            return fallback
+        if self.snapshot_cache is not None:
+            try:
+                self.snapshot_cache.write(tables)
+            except Exception as e:
+                logger.warning(f"Failed to save the local snapshot: {e}")
+        self._snapshot = self._build(tables)
+        return self._snapshot
+
+    def _refresh(self):
+        try:
+            with background_priority(), self._lock:
+                self._load()
+        except Exception as e:
+            logger.error(f"Background load failed: {e}")
+        finally:
+            self._refreshing = False
+
+    # Return the cached snapshot, reloading it first if it is missing or expired
+    def get(self):
+        if self._is_fresh():
+            return self._snapshot
+        with self._lock:
+            # Another session may have reloaded while we waited for the lock
+            if self._is_fresh():
+                return self._snapshot
+            if self._snapshot is None:
+                # New process: render from the saved copy and load from storage in the background
+                saved = self._saved_snapshot()
+                if saved is not None:
+                    self._snapshot = saved
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh, name="data-store-load", daemon=True).start()
+                    logger.info("Serving the local snapshot while the data loads")
+                    return saved
+            return self._load()
+
+    # Fold a flushed ChangeSet into the cached snapshot instead of refetching.
+    # Only the changed cells and rows are copied over from the writer's frames.
+    def apply_changes(self, changes, frames):
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            tables = snapshot_tables(snapshot)
+            for table in changes.tables():
+                tables[table] = _apply_table_changes(table, changes, tables[table], frames[table])
+            pet_index = snapshot.pet_index
+            shelter_partitions = snapshot.shelter_partitions
+            if "pets" in changes.tables():
+                pet_index = build_pet_index(tables["pets"])
+            if "shelters" in changes.tables():
+                shelter_partitions = ShelterPartitions.build(tables["pets"], tables["shelters"])
+            elif "pets" in changes.tables():
+                shelter_partitions = shelter_partitions.with_changes(changes, snapshot.pets, tables["pets"], tables["shelters"])
+            interaction_index = snapshot.interaction_index
+            if "interactions" in changes.tables():
+                appended = frames["interactions"]
+                appended = appended[appended["interaction_id"].isin(changes.appended["interactions"])]
+                interaction_index = interaction_index.with_changes(appended, changes.deleted["interactions"])
+            self.version += 1
+            self._snapshot = Snapshot(
+                **tables,
+                pet_index=pet_index,
+                interaction_index=interaction_index,
+                shelter_partitions=shelter_partitions,
+                version=self.version,
+                loaded_at=snapshot.loaded_at,
+                read_only=snapshot.read_only
+            )
+            # Under the lock, so hooks see every applied change in version order
+            for hook in self._change_hooks:
+                hook(changes, self._snapshot)
+        logger.info(f"Applied changes to data store (version {self.version})")
+
+    # Fold interactions that are not stored yet into the cached interaction index only, e.g. a
+    # queued click. The interactions table keeps what storage holds, so a click costs the clicking
+    # adopter's entry rather than a copy of the table; the rows reach the table once they are written.
+    def apply_interactions(self, appended_df, deleted_ids=()):
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            changes = ChangeSet()
+            for key in appended_df["interaction_id"]:
+                changes.append("interactions", key)
+            for key in deleted_ids:
+                changes.delete("interactions", key)
+            self.version += 1
+            self._snapshot = snapshot._replace(
+                interaction_index=snapshot.interaction_index.with_changes(appended_df, deleted_ids),
+                version=self.version
+            )
+            for hook in self._change_hooks:
+                hook(changes, self._snapshot)
+
+    # Register fn(tables) -> tables, run on every fresh load with a dict of frames by table name,
+    # e.g. to overlay writes that have not reached the source yet
+    def add_load_hook(self, hook):
+        self._load_hooks.append(hook)
+
+    # Register fn() -> interaction rows (cell text) that are not stored yet; every load adds them
+    # to the interaction index, as apply_interactions() did before the reload
+    def add_interaction_overlay(self, overlay):
+        self._interaction_overlays.append(overlay)
+
+    # Register fn(changes, snapshot), run after a ChangeSet is folded into the cache,
+    # e.g. to update derived state incrementally. Hooks must not call back into the store.
+    def add_change_hook(self, hook):
+        self._change_hooks.append(hook)
+
+    # Drop the cached snapshot so the next get() fetches from the source
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+        logger.info("Data store invalidated")
+
+
+# Return the process-wide data store; the first caller's loader is the one that is kept.
+# With a snapshot_dir, loads are saved there for warm starts and offline reads.
+@st.cache_resource
+def get_data_store(_loader, ttl_seconds=DEFAULT_TTL_SECONDS, snapshot_dir=None):
+    return DataStore(_loader, ttl_seconds, SnapshotCache(snapshot_dir) if snapshot_dir else None)
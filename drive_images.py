@@ -0,0 +1,115 @@
+import streamlit as st
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+PAGE_SIZE = 1000
+
+
+# Process-wide name -> Drive file id map for the pet image folder.
+# Built with one paginated listing, then kept current from the Drive changes feed
+# once the TTL runs out, so rendering an image costs no API call.
+class DriveImageIndex:
+    def __init__(self, drive_service, folder_id, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.drive_service = drive_service
+        self.folder_id = folder_id
+        self.ttl_seconds = ttl_seconds
+        self._ids = {}
+        self._names = {}
+        self._page_token = None
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    # List every file in the folder and start following the changes feed from here
+    def rebuild(self):
+        start_token = self.drive_service.changes().getStartPageToken().execute().get("startPageToken")
+        ids = {}
+        page_token = None
+        while True:
+            response = self.drive_service.files().list(
+                q=f"'{self.folder_id}' in parents and trashed = false",
+                fields="nextPageToken, files(id, name)",
+                pageSize=PAGE_SIZE,
+                pageToken=page_token
+            ).execute()
+            for file in response.get("files", []):
+                ids[file["name"]] = file["id"]
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        self._ids = ids
+        self._names = {file_id: name for name, file_id in ids.items()}
+        self._page_token = start_token
+        self._synced_at = time.monotonic()
+        logger.info(f"Indexed {len(ids)} images in Drive folder {self.folder_id}")
+
+    # Apply changes since the last sync; only files in our folder are kept
+    def _apply_changes(self):
+        page_token = self._page_token
+        while page_token:
+            response = self.drive_service.changes().list(
+                pageToken=page_token,
+                fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(id, name, parents, trashed))",
+                pageSize=PAGE_SIZE
+            ).execute()
+            for change in response.get("changes", []):
+                file = change.get("file") or {}
+                file_id = change.get("fileId")
+                # Drop the old entry first so renames and moves don't leave stale names behind
+                old_name = self._names.pop(file_id, None)
+                if old_name is not None and self._ids.get(old_name) == file_id:
+                    del self._ids[old_name]
+                if not change.get("removed") and not file.get("trashed") and self.folder_id in file.get("parents", []):
+                    self._ids[file["name"]] = file_id
+                    self._names[file_id] = file["name"]
+            if "newStartPageToken" in response:
+                self._page_token = response["newStartPageToken"]
+            page_token = response.get("nextPageToken")
+        self._synced_at = time.monotonic()
+
+    def _sync_if_stale(self):
+        if self._synced_at is not None and time.monotonic() - self._synced_at < self.ttl_seconds:
+            return
+        try:
+            if self._page_token is None:
+                self.rebuild()
+            else:
+                self._apply_changes()
+        except Exception as e:
+            logger.error(f"Failed to sync Drive image index: {e}")
+            # Keep serving the entries we have and retry after another TTL
+            self._synced_at = time.monotonic()
+
+    # File id for an image name, or None if the folder has no such file
+    def lookup(self, name):
+        with self._lock:
+            self._sync_if_stale()
+            return self._ids.get(name)
+
+    # Ids for many names with a single freshness check
+    def lookup_many(self, names):
+        with self._lock:
+            self._sync_if_stale()
+            return {name: self._ids.get(name) for name in names}
+
+    # Every file name currently in the folder
+    def names(self):
+        with self._lock:
+            self._sync_if_stale()
+            return list(self._ids)
+
+    # Record a file we just created so it resolves without waiting for the next sync
+    def add(self, name, file_id):
+        with self._lock:
+            self._ids[name] = file_id
+            self._names[file_id] = name
+
+
+# Return the process-wide image index for a Drive folder; the TTL comes from the [cache] secrets section
+@st.cache_resource
+def get_drive_image_index(_drive_service, folder_id):
+    ttl_seconds = st.secrets.get("cache", {}).get("drive_index_ttl_seconds", DEFAULT_TTL_SECONDS)
+    return DriveImageIndex(_drive_service, folder_id, ttl_seconds)
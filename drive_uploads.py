@@ -0,0 +1,69 @@
+import logging
+import mimetypes
+import time
+
+logger = logging.getLogger(__name__)
+
+# Resumable chunks must be a multiple of 256 KB
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_RETRIES = 5
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Leading bytes of the image formats the upload form accepts
+MAGIC_NUMBERS = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+]
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp"}
+
+
+# Detect an image's MIME type from its first bytes, falling back to the browser's type or the file name
+def detect_mime_type(file):
+    position = file.tell()
+    header = file.read(16)
+    file.seek(position)
+    for magic, mime_type in MAGIC_NUMBERS:
+        if header.startswith(magic):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    declared = getattr(file, "type", None)
+    if declared:
+        return declared
+    guessed, _ = mimetypes.guess_type(getattr(file, "name", ""))
+    return guessed or "application/octet-stream"
+
+
+# File extension for a detected MIME type
+def extension_for(mime_type):
+    return EXTENSIONS.get(mime_type, ".jpg")
+
+
+# Upload a file-like object to Drive in resumable chunks, reading only one chunk at a time.
+# Each chunk is retried with exponential backoff; progress(fraction) is called after each one.
+def upload_resumable(drive_service, file, name, folder_id, mime_type, progress=None):
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import MediaIoBaseUpload
+    file.seek(0)
+    media = MediaIoBaseUpload(file, mimetype=mime_type, chunksize=CHUNK_SIZE, resumable=True)
+    request = drive_service.files().create(body={"name": name, "parents": [folder_id]}, media_body=media, fields="id")
+    response = None
+    while response is None:
+        for attempt in range(MAX_CHUNK_RETRIES):
+            try:
+                status, response = request.next_chunk()
+                break
+            except HttpError as http_err:
+                if http_err.resp.status not in RETRYABLE_STATUS or attempt == MAX_CHUNK_RETRIES - 1:
+                    raise
+                logger.warning(f"Chunk upload of {name} failed with {http_err.resp.status} on attempt {attempt + 1}, retrying...")
+            except (ConnectionError, TimeoutError) as conn_err:
+                if attempt == MAX_CHUNK_RETRIES - 1:
+                    raise
+                logger.warning(f"Chunk upload of {name} failed on attempt {attempt + 1}: {conn_err}, retrying...")
+            time.sleep(2 ** attempt)  # Exponential backoff
+        if progress is not None:
+            progress(1.0 if response is not None else status.progress())
+    logger.info(f"Uploaded {name} ({mime_type}) to Google Drive")
+    return response.get("id")
@@ -0,0 +1,123 @@
+import streamlit as st
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from rate_limit import get_rate_limiter, rate_limited_gspread, RateLimitedHttp
+from startup_timing import get_startup_timer
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+# Where a Drive discovery document fetched over the network is kept for the next process
+DEFAULT_DISCOVERY_PATH = os.path.join(".cache", "drive_v3_discovery.json")
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/drive/v3/rest"
+HTTP_TIMEOUT_SECONDS = 60
+
+
+# Stands in for a client until its first use, so pages can hand clients around without
+# importing or authorizing anything on the render path
+class _LazyClient:
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+# One set of Google clients per process, shared by every page and session. The service account
+# credentials are given; the gspread client, on one pooled keep-alive requests session, and the
+# Drive service, built from a discovery document parsed once, are built on first use. The Drive service is safe to
+# share across threads because every request goes out on its thread's own keep-alive httplib2
+# connection. All requests pass through the process-wide rate limiter.
+class GoogleClients:
+    def __init__(self, credentials, limiter, discovery_path=DEFAULT_DISCOVERY_PATH, timer=None):
+        self.credentials = credentials
+        self.limiter = limiter
+        self.discovery_path = discovery_path
+        self.timer = timer
+        self._gc = None
+        self._drive_service = None
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.gc = _LazyClient(self.sheets)
+        self.drive_service = _LazyClient(self.drive)
+
+    @contextmanager
+    def _timed(self, step):
+        started = time.perf_counter()
+        yield
+        if self.timer is not None:
+            self.timer.record(step, time.perf_counter() - started)
+
+    # The shared gspread client
+    def sheets(self):
+        with self._lock:
+            if self._gc is None:
+                with self._timed("Sheets client"):
+                    import gspread
+                    self._gc = rate_limited_gspread(gspread.authorize(self.credentials), self.limiter)
+            return self._gc
+
+    # This thread's authorized connection; httplib2 keeps it alive between requests
+    def _thread_http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            http = RateLimitedHttp(AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT_SECONDS)), self.limiter)
+            self._local.http = http
+        return http
+
+    def _build_request(self, http, *args, **kwargs):
+        from googleapiclient.http import HttpRequest
+        return HttpRequest(self._thread_http(), *args, **kwargs)
+
+    # The Drive discovery document: the copy bundled with googleapiclient, else a locally saved one,
+    # else fetched once from Google's discovery service and saved for the next process
+    def _discovery_document(self):
+        from googleapiclient.discovery_cache import get_static_doc
+        document = get_static_doc("drive", "v3")
+        if document is None and os.path.exists(self.discovery_path):
+            with open(self.discovery_path, encoding="utf-8") as saved:
+                document = saved.read()
+        if document is None:
+            response, document = self._thread_http().request(DISCOVERY_URL)
+            if response.status != 200:
+                raise RuntimeError(f"Fetching the Drive discovery document failed with {response.status}")
+            document = document.decode("utf-8") if isinstance(document, bytes) else document
+            self._save_discovery_document(document)
+        return json.loads(document)
+
+    def _save_discovery_document(self, document):
+        try:
+            os.makedirs(os.path.dirname(self.discovery_path) or ".", exist_ok=True)
+            with open(self.discovery_path, "w", encoding="utf-8") as saved:
+                saved.write(document)
+        except OSError as e:
+            logger.warning(f"Failed to save the Drive discovery document: {e}")
+
+    # The shared Drive service
+    def drive(self):
+        with self._lock:
+            if self._drive_service is None:
+                with self._timed("Drive client"):
+                    http = self._thread_http()
+                    from googleapiclient.discovery import build_from_document
+                    self._drive_service = build_from_document(self._discovery_document(), http=http, requestBuilder=self._build_request)
+            return self._drive_service
+
+
+# Return the process-wide Google clients for the service account in st.secrets["gcp_service_account"].
+# The credentials are parsed here, so a missing or malformed key raises to the caller;
+# the client libraries are only imported when a client is first used.
+@st.cache_resource
+def get_google_clients():
+    timer = get_startup_timer()
+    started = time.perf_counter()
+    from google.oauth2.service_account import Credentials
+    credentials = Credentials.from_service_account_info(dict(st.secrets["gcp_service_account"]), scopes=SCOPES)
+    timer.record("credentials", time.perf_counter() - started)
+    return GoogleClients(credentials, get_rate_limiter(), timer=timer)
@@ -0,0 +1,112 @@
+import streamlit as st
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from image_prefetch import LRUByteCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_CACHE_MB = 64
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+# Process-wide cache of public files such as the catalog CSV and pet photos, shared by all sessions.
+# Bodies are kept with their ETag and Last-Modified headers; once the TTL runs out, a conditional
+# request revalidates them, so an unchanged file costs a 304 without a body. When the server
+# can't be reached, the cached body is served past its TTL, or else a bundled local copy.
+# A bundled copy is only served to callers that pass a fallback, so it never passes for the server's file.
+class ConditionalHttpCache:
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.bodies = LRUByteCache(max_bytes)
+        self.downloads = 0
+        self.revalidations = 0
+        self.fallbacks = 0
+        # url -> (etag, last_modified, checked_at) for the cached body
+        self._validators = {}
+        # URLs whose cached body is the bundled copy rather than the server's
+        self._bundled = set()
+        self._url_locks = {}
+        self._lock = threading.Lock()
+
+    # One request per URL at a time; other sessions wait for its result
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    # Whether the server's copy of a URL is cached; a bundled copy doesn't count
+    def __contains__(self, url):
+        return url in self.bodies and url not in self._bundled
+
+    def _request(self, url, validators):
+        request = urllib.request.Request(url)
+        if validators is not None:
+            etag, last_modified, _ = validators
+            if etag:
+                request.add_header("If-None-Match", etag)
+            if last_modified:
+                request.add_header("If-Modified-Since", last_modified)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return 304, None, e.headers
+            raise
+
+    def _store(self, url, body, etag=None, last_modified=None):
+        self.bodies.put(url, body)
+        self._validators[url] = (etag, last_modified, time.monotonic())
+        self._bundled.discard(url)
+
+    # Body of a URL, fetched or revalidated once its TTL has run out. fallback_path is read
+    # when the server can't be reached and nothing is cached; without one the error is raised.
+    # Callers without a fallback_path get the server's copy or an error, never the bundled one.
+    def get(self, url, fallback_path=None):
+        with self._url_lock(url):
+            body = self.bodies.get(url)
+            validators = self._validators.get(url) if body is not None else None
+            serve_cached = body is not None and (fallback_path or url not in self._bundled)
+            if validators is not None and time.monotonic() - validators[2] < self.ttl_seconds:
+                if not serve_cached:
+                    raise ConnectionError(f"{url} was unreachable within the last {self.ttl_seconds} s")
+                return body
+            try:
+                status, data, headers = self._request(url, validators)
+            except Exception as e:
+                if body is not None:
+                    # Try the server again after another TTL rather than on every rerun
+                    self._validators[url] = (validators[0], validators[1], time.monotonic())
+                if serve_cached:
+                    logger.warning(f"Failed to revalidate {url}, serving the cached copy: {e}")
+                    return body
+                if body is None and fallback_path and os.path.exists(fallback_path):
+                    logger.warning(f"Failed to fetch {url}, serving the bundled {fallback_path}: {e}")
+                    with open(fallback_path, "rb") as bundled:
+                        body = bundled.read()
+                    self._store(url, body)
+                    self._bundled.add(url)
+                    self.fallbacks += 1
+                    return body
+                raise
+            if status == 304:
+                self._validators[url] = (validators[0], validators[1], time.monotonic())
+                self.revalidations += 1
+                return body
+            self._store(url, data, headers.get("ETag"), headers.get("Last-Modified"))
+            self.downloads += 1
+            return data
+
+    def stats(self):
+        return {**self.bodies.stats(), "downloads": self.downloads, "revalidations": self.revalidations, "fallbacks": self.fallbacks}
+
+
+# Return the process-wide HTTP cache
+@st.cache_resource
+def get_http_cache(ttl_seconds=DEFAULT_TTL_SECONDS, cache_mb=DEFAULT_CACHE_MB):
+    return ConditionalHttpCache(ttl_seconds, cache_mb * 1024 * 1024)
@@ -0,0 +1,176 @@
+import io
+import logging
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from PIL import Image, ImageOps
+from rate_limit import background_priority
+
+logger = logging.getLogger(__name__)
+
+# Widths the pages display photos at; the original is kept for anything larger
+DERIVATIVE_WIDTHS = (300, 600)
+# Smallest encoding first, so callers can take the first one that exists
+DERIVATIVE_FORMATS = (("webp", "WEBP", "image/webp"), ("jpg", "JPEG", "image/jpeg"))
+QUALITY = 82
+DEFAULT_DERIVATIVES_DIR = os.path.join("pet_pics", "derivatives")
+
+
+# File name of one derivative, e.g. PET1A2B3C.jpg -> PET1A2B3C_w300.webp
+def derivative_name(image_name, width, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f"{stem}_w{width}.{extension}"
+
+
+# Derivative names to try for an image shown at display_width, best fit first
+def derivative_candidates(image_name, display_width):
+    widths = [width for width in DERIVATIVE_WIDTHS if width >= display_width]
+    return [derivative_name(image_name, width, extension) for width in widths for extension, _, _ in DERIVATIVE_FORMATS]
+
+
+# Decode a photo upright and in a mode every output format can store
+def _decode(source):
+    image = ImageOps.exif_transpose(source)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    return image
+
+
+# Scale an image down to width, keeping its aspect ratio; narrower images are never upscaled
+def _fit_width(image, width):
+    if image.width <= width:
+        return image
+    return image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+
+
+def _encode(image, pil_format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=pil_format, quality=QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+# Resize and re-encode one photo, given as bytes or a seekable file.
+# Returns {name: (bytes, mime type)} for every derivative; photos narrower than
+# a target width are re-encoded at their own size, never upscaled.
+def make_derivatives(image, image_name):
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    with Image.open(image) as source:
+        image = _decode(source)
+        derivatives = {}
+        for width in DERIVATIVE_WIDTHS:
+            resized = _fit_width(image, width)
+            for extension, pil_format, mime_type in DERIVATIVE_FORMATS:
+                derivatives[derivative_name(image_name, width, extension)] = (_encode(resized, pil_format), mime_type)
+    return derivatives
+
+
+# One photo, given as bytes or a seekable file such as an mmap, resized to width and encoded as pil_format
+def make_variant(image, width, pil_format="JPEG"):
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    with Image.open(image) as source:
+        return _encode(_fit_width(_decode(source), width), pil_format)
+
+
+# Worker for the local backfill: write one photo's derivatives unless they are already newer
+def _backfill_file(source_path, output_dir):
+    source_mtime = os.path.getmtime(source_path)
+    image_name = os.path.basename(source_path)
+    expected = [
+        os.path.join(output_dir, derivative_name(image_name, width, extension))
+        for width in DERIVATIVE_WIDTHS for extension, _, _ in DERIVATIVE_FORMATS
+    ]
+    if all(os.path.exists(path) and os.path.getmtime(path) >= source_mtime for path in expected):
+        return image_name, 0
+    with open(source_path, "rb") as source:
+        derivatives = make_derivatives(source.read(), image_name)
+    for name, (data, _) in derivatives.items():
+        with open(os.path.join(output_dir, name), "wb") as output:
+            output.write(data)
+    return image_name, len(derivatives)
+
+
+# Create derivatives for every photo in source_dir on a process pool
+def backfill_directory(source_dir="pet_pics", output_dir=DEFAULT_DERIVATIVES_DIR, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [
+        os.path.join(source_dir, name) for name in sorted(os.listdir(source_dir))
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    ]
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for image_name, count in pool.map(_backfill_file, paths, [output_dir] * len(paths)):
+            written += count
+            logger.info(f"{image_name}: {count} derivatives written")
+    logger.info(f"Backfilled {len(paths)} photos into {output_dir} ({written} files written)")
+    return written
+
+
+# Upload one photo's derivatives to the Drive folder and record them in the image index
+def upload_derivatives(drive_service, folder_id, derivatives, image_index=None):
+    from googleapiclient.http import MediaIoBaseUpload
+    for name, (data, mime_type) in derivatives.items():
+        media = MediaIoBaseUpload(io.BytesIO(data), mimetype=mime_type)
+        file = drive_service.files().create(body={"name": name, "parents": [folder_id]}, media_body=media, fields="id").execute()
+        if image_index is not None:
+            image_index.add(name, file.get("id"))
+
+
+# True for names produced by derivative_name()
+def is_derivative(image_name):
+    return re.search(r"_w\d+$", os.path.splitext(image_name)[0]) is not None
+
+
+# Create missing derivatives for every original photo in the Drive folder.
+# Resizing runs on a process pool while the next originals download; at most two photos per
+# worker are downloaded ahead, and each one's derivatives are uploaded as soon as they are ready.
+def backfill_drive(drive_service, folder_id, image_index, workers=None):
+    names = image_index.names()
+    existing = set(names)
+    missing = [
+        name for name in names
+        if name.lower().endswith((".jpg", ".jpeg", ".png")) and not is_derivative(name)
+        and not all(candidate in existing for candidate in derivative_candidates(name, 0))
+    ]
+    window = (workers or os.cpu_count() or 1) * 2
+
+    # A bulk job: interactive Drive calls from the app go first
+    with background_priority(), ProcessPoolExecutor(max_workers=workers) as pool:
+        # Transfers stay on this thread; the pool only resizes
+        pending = list(reversed(missing))
+        in_flight = {}
+        while pending or in_flight:
+            while pending and len(in_flight) < window:
+                name = pending.pop()
+                data = drive_service.files().get_media(fileId=image_index.lookup(name)).execute()
+                in_flight[pool.submit(make_derivatives, data, name)] = name
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = in_flight.pop(future)
+                upload_derivatives(drive_service, folder_id, future.result(), image_index)
+                logger.info(f"Uploaded derivatives for {name}")
+    return len(missing)
+
+
+# Backfill the Drive photo folder named in the [gcp] secrets section, with the app's service account
+def backfill_drive_from_secrets(workers=None):
+    import streamlit as st
+    from drive_images import DriveImageIndex
+    from google_clients import get_google_clients
+    drive_service = get_google_clients().drive_service
+    folder_id = st.secrets["gcp"]["drive_folder_id"]
+    count = backfill_drive(drive_service, folder_id, DriveImageIndex(drive_service, folder_id), workers)
+    logger.info(f"Backfilled derivatives for {count} photos in the Drive folder")
+    return count
+
+
+if __name__ == "__main__":
+    # Backfill the bundled photos: python image_pipeline.py [source_dir] [output_dir]
+    # Backfill the shelters' photos on Drive: python image_pipeline.py --drive
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:2] == ["--drive"]:
+        backfill_drive_from_secrets()
+    else:
+        backfill_directory(*sys.argv[1:3])
@@ -0,0 +1,175 @@
+import streamlit as st
+import logging
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+from rate_limit import BACKGROUND, INTERACTIVE, background_priority
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOOKAHEAD = 3
+DEFAULT_CACHE_MB = 64
+DEFAULT_WORKERS = 4
+FETCH_TIMEOUT_SECONDS = 10
+# How long a card waits on its photo before it renders without one; the fetch carries on in the background
+GET_WAIT_SECONDS = 2
+# A photo that failed to load is not tried again for this long
+FAILURE_TTL_SECONDS = 60
+
+
+# Size-bounded LRU of image bytes, shared by all sessions
+class LRUByteCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+
+# Download a URL's body
+def fetch_url_bytes(url):
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_SECONDS) as response:
+        return response.read()
+
+
+# Resolves and downloads images for upcoming cards on a thread pool, so the next
+# card renders from memory. resolve_url(image_path) returns a URL or None.
+# Photos that fail to resolve or download are remembered for failure_ttl seconds, and get()
+# returns None for them, as for a photo still downloading after wait_seconds.
+class ImagePrefetcher:
+    def __init__(self, resolve_url, cache, workers=DEFAULT_WORKERS, fetch=fetch_url_bytes,
+                 wait_seconds=GET_WAIT_SECONDS, failure_ttl=FAILURE_TTL_SECONDS):
+        self.resolve_url = resolve_url
+        self.cache = cache
+        self.fetch = fetch
+        self.wait_seconds = wait_seconds
+        self.failure_ttl = failure_ttl
+        self.prefetched = 0
+        self.failures = 0
+        self._in_flight = {}
+        self._failed_until = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prefetch")
+        self._lock = threading.Lock()
+
+    def _load(self, image_path, priority):
+        try:
+            # Drive lookups made for upcoming cards yield to those for the card on screen
+            with (background_priority() if priority == BACKGROUND else nullcontext()):
+                url = self.resolve_url(image_path)
+                if not url:
+                    self._failed(image_path)
+                    return None
+                data = self.fetch(url)
+            self.cache.put(image_path, data)
+            return data
+        except Exception as e:
+            logger.warning(f"Failed to fetch image {image_path}: {e}")
+            self._failed(image_path)
+            return None
+        finally:
+            with self._lock:
+                self._in_flight.pop(image_path, None)
+
+    def _failed(self, image_path):
+        with self._lock:
+            self._failed_until[image_path] = time.monotonic() + self.failure_ttl
+            self.failures += 1
+
+    # True while a failed photo is not to be tried again
+    def _recently_failed(self, image_path):
+        with self._lock:
+            until = self._failed_until.get(image_path)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._failed_until[image_path]
+                return False
+            return True
+
+    def _submit(self, image_path, priority=INTERACTIVE):
+        with self._lock:
+            future = self._in_flight.get(image_path)
+            if future is None:
+                future = self._pool.submit(self._load, image_path, priority)
+                self._in_flight[image_path] = future
+            return future
+
+    # Start background fetches for images that are neither cached, already in flight nor recently failed
+    def prefetch(self, image_paths):
+        for image_path in image_paths:
+            if image_path and image_path not in self.cache and not self._recently_failed(image_path):
+                self._submit(image_path, BACKGROUND)
+                self.prefetched += 1
+
+    # Image bytes from the cache, waiting on an in-flight prefetch or fetching now on a miss.
+    # None when the photo failed recently or is not ready within wait_seconds; the page shows
+    # its placeholder instead and picks the photo up from the cache on a later rerun.
+    def get(self, image_path):
+        if not image_path:
+            return None
+        data = self.cache.get(image_path)
+        if data is not None:
+            return data
+        if self._recently_failed(image_path):
+            return None
+        try:
+            return self._submit(image_path).result(timeout=self.wait_seconds)
+        except FutureTimeoutError:
+            logger.info(f"Image {image_path} is still downloading; showing the placeholder")
+            return None
+
+    def stats(self):
+        return {**self.cache.stats(), "prefetched": self.prefetched, "failures": self.failures}
+
+
+# Return the process-wide prefetcher, configured from the [prefetch] secrets section.
+# The first caller's resolver is kept.
+@st.cache_resource
+def get_image_prefetcher(_resolve_url):
+    config = st.secrets.get("prefetch", {})
+    cache = LRUByteCache(config.get("cache_mb", DEFAULT_CACHE_MB) * 1024 * 1024)
+    return ImagePrefetcher(
+        _resolve_url, cache, workers=config.get("workers", DEFAULT_WORKERS),
+        wait_seconds=config.get("wait_seconds", GET_WAIT_SECONDS),
+        failure_ttl=config.get("failure_ttl_seconds", FAILURE_TTL_SECONDS),
+    )
+
+
+# Number of upcoming cards to prefetch
+def get_lookahead():
+    return st.secrets.get("prefetch", {}).get("lookahead", DEFAULT_LOOKAHEAD)
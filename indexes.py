@@ -0,0 +1,210 @@
+import bisect
+import numpy as np
+import pandas as pd
+
+
+# Map each pet_id to its row position in pets_df; rebuild after every data load
+def build_pet_index(pets_df):
+    if pets_df.empty or "pet_id" not in pets_df.columns:
+        return {}
+    return {pet_id: pos for pos, pet_id in enumerate(pets_df["pet_id"])}
+
+
+# Columns that decide which shelter a pet belongs to
+SHELTER_KEY_COLUMNS = {"shelter_id", "sheltername"}
+# Pet columns the shelter statistics count by
+SHELTER_STATS_COLUMNS = ["species", "time_in_shelter"]
+
+
+# Shelter id of every pet in pets_df: its shelter_id foreign key, or for rows stored before that
+# column existed, the id of the shelter with its sheltername. None where neither resolves.
+def pet_shelter_ids(pets_df, shelters_df):
+    ids_by_name = {} if shelters_df.empty else dict(zip(shelters_df["name"][::-1], shelters_df["shelter_id"][::-1]))
+    names = pets_df["sheltername"] if "sheltername" in pets_df.columns else [None] * len(pets_df)
+    stored = pets_df["shelter_id"] if "shelter_id" in pets_df.columns else [None] * len(pets_df)
+    return [
+        shelter_id if isinstance(shelter_id, str) and shelter_id else ids_by_name.get(name)
+        for shelter_id, name in zip(stored, names)
+    ]
+
+
+# Fill blank shelter_id cells from the pets' shelter names; frames without the column are left alone
+def fill_pet_shelter_ids(pets_df, shelters_df):
+    if "shelter_id" not in pets_df.columns or pets_df.empty:
+        return pets_df
+    pets_df = pets_df.copy()
+    pets_df["shelter_id"] = [shelter_id or "" for shelter_id in pet_shelter_ids(pets_df, shelters_df)]
+    return pets_df
+
+
+# Row positions of each shelter's pets in pets_df, keyed by shelter_id and kept sorted, so a
+# shelter's pets are pets_df.iloc[partitions.get(shelter_id)] in catalog order.
+# Instances are never mutated; with_changes() returns new partitions for a changed pets frame.
+class ShelterPartitions:
+    def __init__(self, positions=None):
+        self._positions = positions or {}
+
+    @classmethod
+    def build(cls, pets_df, shelters_df):
+        if pets_df.empty:
+            return cls()
+        shelter_ids = pd.Series(pet_shelter_ids(pets_df, shelters_df), dtype=object)
+        return cls({shelter_id: positions for shelter_id, positions in shelter_ids.groupby(shelter_ids, sort=False).indices.items()})
+
+    def get(self, shelter_id):
+        return self._positions.get(shelter_id, np.empty(0, dtype=np.intp))
+
+    # Counts of one shelter's pets by each of columns, read from its slice of pets_df only
+    def stats(self, pets_df, shelter_id, columns=SHELTER_STATS_COLUMNS):
+        pets = pets_df.iloc[self.get(shelter_id)]
+        stats = {}
+        for column in columns:
+            if column in pets.columns:
+                counts = pets[column].value_counts(sort=False)
+                stats[column] = counts[counts > 0].sort_index()
+        return stats
+
+    # Partitions for new_pets, the pets frame after changes were applied to old_pets:
+    # deleted rows are dropped and the positions after them shifted down, pets that moved
+    # shelter are re-filed, and appended rows are filed under their shelter.
+    def with_changes(self, changes, old_pets, new_pets, shelters_df):
+        deleted = pd.Index(old_pets["pet_id"]).get_indexer(list(changes.deleted["pets"]))
+        deleted = np.sort(deleted[deleted >= 0])
+        new_rows = pd.Index(new_pets["pet_id"])
+        moved = new_rows.get_indexer([pet_id for pet_id, columns in changes.updated["pets"].items() if columns & SHELTER_KEY_COLUMNS])
+        moved = moved[moved >= 0]
+
+        positions = {}
+        for shelter_id, rows in self._positions.items():
+            if len(deleted):
+                rows = rows[~np.isin(rows, deleted)]
+                rows = rows - np.searchsorted(deleted, rows)
+            if len(moved):
+                rows = rows[~np.isin(rows, moved)]
+            if len(rows):
+                positions[shelter_id] = rows
+        refiled = np.concatenate([moved, new_rows.get_indexer(list(changes.appended["pets"]))]).astype(np.intp)
+        refiled = refiled[refiled >= 0]
+        shelter_ids = pet_shelter_ids(new_pets.iloc[refiled], shelters_df)
+        for shelter_id, row in zip(shelter_ids, refiled):
+            positions[shelter_id] = np.append(positions.get(shelter_id, np.empty(0, dtype=np.intp)), row)
+        for shelter_id in set(shelter_ids):
+            positions[shelter_id] = np.sort(positions[shelter_id])
+        return ShelterPartitions(positions)
+
+
+# Pet attributes calculate_match compares against the adopter, plus special_needs presence
+SCORED_ATTRIBUTES = ["species", "gender", "activity_level", "allergy_friendly"]
+
+
+# The scored attributes of one pet; every pet with the same signature gets the same score from any adopter.
+# Missing values all become None so they compare equal.
+def pet_signature(pet):
+    values = tuple(None if pd.isna(pet[attribute]) else pet[attribute] for attribute in SCORED_ATTRIBUTES)
+    return values + (bool(pet.get("special_needs", "")),)
+
+
+def _signature_column(column):
+    values = column.to_numpy(dtype=object)
+    values[pd.isna(values)] = None
+    return values.tolist()
+
+
+# A stand-in pet row for a signature, enough for calculate_match. Missing values go back in as
+# NaN, as the typed frames hold them, so a missing preference still matches them through `in`.
+def signature_pet(signature):
+    pet = {attribute: np.nan if value is None else value for attribute, value in zip(SCORED_ATTRIBUTES, signature)}
+    pet["special_needs"] = "Yes" if signature[-1] else ""
+    return pet
+
+
+# Posting lists over pets: pet sequence numbers grouped by signature and by shelter.
+# Sequence numbers follow catalog order (a pet's row position at build time, then one past
+# the highest for each added pet) and are never reused, so they stay valid across deletes.
+# Every list is kept sorted, so equal-score groups merge back into catalog order.
+class PetAttributeIndex:
+    def __init__(self):
+        self.pet_ids = []
+        self._seq_of = {}
+        self._signature_of = {}
+        self._shelter_of = {}
+        self.by_signature = {}
+        self.by_shelter = {}
+
+    @classmethod
+    def build(cls, pets_df):
+        index = cls()
+        if pets_df.empty or "pet_id" not in pets_df.columns:
+            return index
+        index.pet_ids = pets_df["pet_id"].to_numpy(dtype=object).tolist()
+        index._seq_of = {pet_id: seq for seq, pet_id in enumerate(index.pet_ids)}
+        columns = [_signature_column(pets_df[attribute]) for attribute in SCORED_ATTRIBUTES]
+        if "special_needs" in pets_df.columns:
+            columns.append(pets_df["special_needs"].to_numpy(dtype=object).astype(bool).tolist())
+        else:
+            columns.append([False] * len(pets_df))
+        signatures = list(zip(*columns))
+        shelters = _signature_column(pets_df["sheltername"]) if "sheltername" in pets_df.columns else [""] * len(pets_df)
+        index._signature_of = dict(zip(index.pet_ids, signatures))
+        index._shelter_of = dict(zip(index.pet_ids, shelters))
+        # Appending in catalog order leaves every posting list sorted
+        for seq, (signature, shelter) in enumerate(zip(signatures, shelters)):
+            index.by_signature.setdefault(signature, []).append(seq)
+            index.by_shelter.setdefault(shelter, []).append(seq)
+        return index
+
+    def __len__(self):
+        return len(self._seq_of)
+
+    def __contains__(self, pet_id):
+        return pet_id in self._seq_of
+
+    def seq(self, pet_id):
+        return self._seq_of[pet_id]
+
+    def signature(self, pet_id):
+        return self._signature_of[pet_id]
+
+    @staticmethod
+    def _insert(postings, key, seq):
+        bisect.insort(postings.setdefault(key, []), seq)
+
+    @staticmethod
+    def _discard(postings, key, seq):
+        seqs = postings[key]
+        del seqs[bisect.bisect_left(seqs, seq)]
+        if not seqs:
+            del postings[key]
+
+    # Add a new pet at the end of the catalog, or re-file an edited one under its current values
+    def put(self, pet):
+        pet_id = pet["pet_id"]
+        signature = pet_signature(pet)
+        shelter = pet.get("sheltername", "")
+        shelter = None if pd.isna(shelter) else shelter
+        seq = self._seq_of.get(pet_id)
+        if seq is None:
+            seq = len(self.pet_ids)
+            self.pet_ids.append(pet_id)
+            self._seq_of[pet_id] = seq
+        else:
+            if self._signature_of[pet_id] == signature and self._shelter_of[pet_id] == shelter:
+                return
+            self._discard(self.by_signature, self._signature_of[pet_id], seq)
+            self._discard(self.by_shelter, self._shelter_of[pet_id], seq)
+        self._signature_of[pet_id] = signature
+        self._shelter_of[pet_id] = shelter
+        self._insert(self.by_signature, signature, seq)
+        self._insert(self.by_shelter, shelter, seq)
+
+    def remove(self, pet_id):
+        seq = self._seq_of.pop(pet_id, None)
+        if seq is None:
+            return
+        self.pet_ids[seq] = None
+        self._discard(self.by_signature, self._signature_of.pop(pet_id), seq)
+        self._discard(self.by_shelter, self._shelter_of.pop(pet_id), seq)
+
+    # Pet ids of one shelter in catalog order
+    def shelter_pets(self, sheltername):
+        return [self.pet_ids[seq] for seq in self.by_shelter.get(sheltername, [])]
@@ -0,0 +1,184 @@
+import streamlit as st
+import json
+import logging
+import os
+import threading
+import time
+from interactions import interaction_id, interaction_rows
+from rate_limit import background_priority
+from sheet_writes import ChangeSet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL_SECONDS = 2.0
+DEFAULT_JOURNAL_PATH = "interactions_journal.jsonl"
+
+
+# Write-behind queue for like/skip clicks from every session in the process.
+# enqueue() journals the event, adds it to the shared interaction index and returns at once;
+# a background thread writes pending events to storage in batches, by size or age, and only
+# then folds their rows into the cached interactions table.
+class InteractionQueue:
+    def __init__(self, backend, data_store, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval_seconds=DEFAULT_FLUSH_INTERVAL_SECONDS, journal_path=DEFAULT_JOURNAL_PATH):
+        self.backend = backend
+        self.data_store = data_store
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.journal_path = journal_path
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Held while a batch is written, so discard_adopter() can wait for it
+        self._flush_lock = threading.Lock()
+        self._pending.extend(self._read_journal())
+        if self._pending:
+            logger.info(f"Recovered {len(self._pending)} unflushed interactions from {journal_path}")
+        # Reloads from storage must not drop events that are still waiting to be written
+        data_store.add_load_hook(self._drop_stored_on_load)
+        data_store.add_interaction_overlay(self._pending_rows)
+        if self._pending:
+            # The store may have loaded before this queue existed
+            data_store.apply_interactions(self._pending_rows())
+        self._thread = threading.Thread(target=self._run, name="interaction-flusher", daemon=True)
+        self._thread.start()
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return []
+        events = []
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a torn last line
+                    logger.warning(f"Skipping unreadable journal line in {self.journal_path}")
+        return events
+
+    # Rewrite the journal with only the events that are still pending
+    def _compact_journal(self):
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as journal:
+            for event in self._pending:
+                journal.write(json.dumps(event) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    # Drop pending events that storage already has, e.g. ones replayed from the journal after
+    # a crash between their flush and the journal compaction; call with the lock held
+    def _drop_stored(self, interactions_df):
+        if "interaction_id" not in interactions_df.columns or not self._pending:
+            return
+        stored = set(interactions_df["interaction_id"])
+        pending = [
+            event for event in self._pending
+            if interaction_id(event["adopter_id"], event["pet_id"], event["action"]) not in stored
+        ]
+        if len(pending) < len(self._pending):
+            logger.info(f"Dropping {len(self._pending) - len(pending)} journaled interactions that are already stored")
+            self._pending = pending
+            self._compact_journal()
+
+    def _drop_stored_on_load(self, tables):
+        with self._lock:
+            self._drop_stored(tables["interactions"])
+        return tables
+
+    # Rows of the events still waiting to be written, for the data store's interaction index
+    def _pending_rows(self):
+        with self._lock:
+            return interaction_rows(self._pending)
+
+    # Record a like or skip; returns as soon as the event is journaled and visible in the cache
+    def enqueue(self, adopter_id, pet_id, action):
+        if self.data_store.get().interaction_index.has(adopter_id, pet_id, action):
+            return
+        event = {"adopter_id": adopter_id, "pet_id": pet_id, "action": action, "timestamp": time.time()}
+        with self._lock:
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                journal.write(json.dumps(event) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._pending.append(event)
+            self._wakeup.notify()
+        # Optimistic update so this and other sessions see the click right away
+        self.data_store.apply_interactions(interaction_rows([event]))
+
+    # Drop an adopter's events that are not written yet, from the queue, the journal and the
+    # shared index, e.g. before the account is deleted. A batch being written is waited for,
+    # so afterwards every other event of the adopter is in the stored interactions table.
+    def discard_adopter(self, adopter_id):
+        with self._flush_lock, self._lock:
+            discarded = [event for event in self._pending if event["adopter_id"] == adopter_id]
+            if not discarded:
+                return 0
+            self._pending = [event for event in self._pending if event["adopter_id"] != adopter_id]
+            self._compact_journal()
+        rows = interaction_rows(discarded)
+        self.data_store.apply_interactions(rows.iloc[:0], rows["interaction_id"].tolist())
+        logger.info(f"Discarded {len(discarded)} unwritten interactions of adopter {adopter_id}")
+        return len(discarded)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+                # Hold off until the batch is full or its oldest event is due
+                while len(self._pending) < self.batch_size:
+                    remaining = self.flush_interval_seconds - (time.time() - self._pending[0]["timestamp"])
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                batch = list(self._pending[:self.batch_size])
+            try:
+                with background_priority(), self._flush_lock:
+                    self._flush(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} interactions, will retry: {e}")
+                time.sleep(self.flush_interval_seconds)
+                continue
+            with self._lock:
+                # A reload may have dropped events of the batch already, so remove by identity
+                flushed = {id(event) for event in batch}
+                self._pending = [event for event in self._pending if id(event) not in flushed]
+                self._compact_journal()
+
+    # Write a batch as one append of interaction rows
+    def _flush(self, events):
+        snapshot = self.data_store.get()
+        if snapshot.read_only:
+            # Storage is unreachable; the events stay journaled until it is back
+            raise RuntimeError("storage is unreachable")
+        # Loading the snapshot may have found some of the events already stored
+        with self._lock:
+            pending = {id(event) for event in self._pending}
+        events = [event for event in events if id(event) in pending]
+        if not events:
+            return
+        rows = interaction_rows(events)
+        changes = ChangeSet()
+        for key in rows["interaction_id"]:
+            changes.append("interactions", key)
+        self.backend.write_changes(changes, {"interactions": rows}, snapshot)
+        # The cached table now matches storage; the index already has the rows
+        self.data_store.apply_changes(changes, {"interactions": rows})
+        logger.info(f"Flushed {len(rows)} interactions")
+
+
+# Return the process-wide interaction queue, configured from the [interactions] secrets section
+@st.cache_resource
+def get_interaction_queue(_backend, _data_store):
+    config = st.secrets.get("interactions", {})
+    return InteractionQueue(
+        _backend, _data_store,
+        batch_size=config.get("batch_size", DEFAULT_BATCH_SIZE),
+        flush_interval_seconds=config.get("flush_interval_seconds", DEFAULT_FLUSH_INTERVAL_SECONDS),
+        journal_path=config.get("journal_path", DEFAULT_JOURNAL_PATH)
+    )
@@ -0,0 +1,93 @@
+import pandas as pd
+from collections import namedtuple
+
+INTERACTION_COLUMNS = ["interaction_id", "adopter_id", "pet_id", "action", "timestamp"]
+ACTIONS = ("like", "skip")
+# Comma-joined adopter columns the interactions table replaces
+LEGACY_COLUMNS = {"like": "liked_pets", "skip": "skipped_pets"}
+
+AdopterInteractions = namedtuple("AdopterInteractions", ["liked", "skipped", "excluded"])
+EMPTY = AdopterInteractions((), (), frozenset())
+
+
+# Natural key of an interaction; one row per adopter, pet and action
+def interaction_id(adopter_id, pet_id, action):
+    return f"{adopter_id}:{action}:{pet_id}"
+
+
+# Interactions frame (cell text) for a list of {adopter_id, pet_id, action, timestamp} events
+def interaction_rows(events):
+    rows = [
+        [interaction_id(event["adopter_id"], event["pet_id"], event["action"]),
+         event["adopter_id"], event["pet_id"], event["action"], str(event.get("timestamp", ""))]
+        for event in events
+    ]
+    return pd.DataFrame(rows, columns=INTERACTION_COLUMNS).drop_duplicates("interaction_id")
+
+
+# Build interaction rows from the adopters' comma-joined liked_pets/skipped_pets columns.
+# The legacy columns carry no time, so rows keep the list order and an empty timestamp.
+def migrate_legacy_interactions(adopters_df):
+    events = []
+    for action, column in LEGACY_COLUMNS.items():
+        if column not in adopters_df.columns:
+            continue
+        for adopter_id, value in zip(adopters_df["adopter_id"], adopters_df[column]):
+            if isinstance(value, str) and value.strip():
+                events.extend(
+                    {"adopter_id": adopter_id, "pet_id": pet_id, "action": action, "timestamp": ""}
+                    for pet_id in value.split(",") if pet_id
+                )
+    return interaction_rows(events)
+
+
+# Per-adopter view of the interactions table: liked and skipped pet ids in the order
+# they happened, and a hashed set of every pet the adopter has already seen.
+# Instances are never mutated; with_changes() returns a new index sharing untouched adopters.
+class InteractionIndex:
+    def __init__(self, by_adopter=None):
+        self._by_adopter = by_adopter or {}
+
+    def get(self, adopter_id):
+        return self._by_adopter.get(adopter_id, EMPTY)
+
+    def liked(self, adopter_id):
+        return list(self.get(adopter_id).liked)
+
+    def skipped(self, adopter_id):
+        return list(self.get(adopter_id).skipped)
+
+    def excluded(self, adopter_id):
+        return self.get(adopter_id).excluded
+
+    def has(self, adopter_id, pet_id, action):
+        entry = self.get(adopter_id)
+        return pet_id in entry.excluded and pet_id in (entry.liked if action == "like" else entry.skipped)
+
+    def with_changes(self, appended_df, deleted_ids=()):
+        by_adopter = dict(self._by_adopter)
+        # adopter_id -> {action: dict used as an ordered set of pet ids}
+        touched = {}
+
+        def lists_for(adopter_id):
+            if adopter_id not in touched:
+                entry = self.get(adopter_id)
+                touched[adopter_id] = {"like": dict.fromkeys(entry.liked), "skip": dict.fromkeys(entry.skipped)}
+            return touched[adopter_id]
+
+        for adopter_id, pet_id, action in zip(appended_df["adopter_id"], appended_df["pet_id"], appended_df["action"]):
+            lists_for(adopter_id)[action].setdefault(pet_id)
+        for deleted_id in deleted_ids:
+            adopter_id, action, pet_id = deleted_id.split(":", 2)
+            lists_for(adopter_id)[action].pop(pet_id, None)
+        for adopter_id, lists in touched.items():
+            liked, skipped = tuple(lists["like"]), tuple(lists["skip"])
+            by_adopter[adopter_id] = AdopterInteractions(liked, skipped, frozenset(liked) | frozenset(skipped))
+        return InteractionIndex(by_adopter)
+
+
+# Build the per-adopter index from the interactions frame in one pass
+def build_interaction_index(interactions_df):
+    if interactions_df.empty:
+        return InteractionIndex()
+    return InteractionIndex().with_changes(interactions_df)
@@ -0,0 +1,43 @@
+import math
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 10
+# Shelter columns shown next to each liked pet, renamed so they don't clash with the pet's
+SHELTER_COLUMNS = {"shelter_id": "shelter_key", "name": "shelter_name", "address": "shelter_address", "email": "shelter_email", "phone": "shelter_phone"}
+
+
+# Shelter phone as shown to adopters: digit-only numbers get their country code split off
+def format_phone(phone):
+    phone = "" if pd.isna(phone) else str(phone).strip()
+    if not phone:
+        return "Not provided"
+    if len(phone) >= 3 and phone.isdigit():
+        return f"+{phone[:3]} {phone[3:]}"
+    return phone
+
+
+# One contact row per shelter, with the phone formatted once per shelter
+def shelter_contacts(shelters_df):
+    contacts = shelters_df[list(SHELTER_COLUMNS)].rename(columns=SHELTER_COLUMNS)
+    contacts["shelter_phone"] = contacts["shelter_phone"].map(format_phone)
+    return contacts
+
+
+def page_count(liked_ids, page_size=DEFAULT_PAGE_SIZE):
+    return max(1, math.ceil(len(liked_ids) / page_size))
+
+
+# One page of an adopter's liked pets, in the order they were liked: the pets' rows joined with
+# their shelter's contact columns, plus the liked ids that are no longer in the catalog.
+# Only the page's pets are looked up, so a page costs the same however many pets were liked.
+# Pets are joined on their shelter_id, or by shelter name where storage has no such column;
+# pets whose shelter is gone are left out. page counts from 1.
+def liked_pets_page(liked_ids, pets_df, pet_index, contacts, page=1, page_size=DEFAULT_PAGE_SIZE):
+    page_ids = [pet_id for pet_id in liked_ids[(page - 1) * page_size:page * page_size] if pet_id]
+    missing = [pet_id for pet_id in page_ids if pet_id not in pet_index]
+    pets = pets_df.iloc[[pet_index[pet_id] for pet_id in page_ids if pet_id in pet_index]]
+    if "shelter_id" in pets.columns:
+        rows = pets.merge(contacts, left_on="shelter_id", right_on="shelter_key", how="inner", sort=False)
+    else:
+        rows = pets.merge(contacts.drop_duplicates("shelter_name"), left_on="sheltername", right_on="shelter_name", how="inner", sort=False)
+    return rows.drop(columns="shelter_key").reset_index(drop=True), missing
@@ -0,0 +1,87 @@
+import streamlit as st
+import logging
+import mmap
+import os
+import threading
+from image_pipeline import DEFAULT_DERIVATIVES_DIR, derivative_name, make_variant
+from image_prefetch import LRUByteCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_MB = 64
+DEFAULT_WARM_COUNT = 10
+# Originals at least this large are memory-mapped for resizing instead of read into memory
+MMAP_THRESHOLD_BYTES = 1024 * 1024
+
+
+# Serves the photos bundled under root (pet_pics/...) from a size-bounded LRU of encoded bytes,
+# shared by all sessions. A photo asked for at a display width comes back as a JPEG of exactly
+# that width: a bundled derivative when one exists, otherwise resized once from the original.
+# st.image then sends the bytes as they are instead of resizing or re-encoding on every render.
+class LocalImageProvider:
+    def __init__(self, root, cache, mmap_threshold=MMAP_THRESHOLD_BYTES):
+        self.root = root
+        self.cache = cache
+        self.mmap_threshold = mmap_threshold
+        self.resized = 0
+
+    def _path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def _read(self, relative_path):
+        with open(self._path(relative_path), "rb") as image_file:
+            return image_file.read()
+
+    # True if the photo ships with the app
+    def has(self, image_path):
+        return bool(image_path) and os.path.isfile(self._path(image_path))
+
+    def _variant(self, image_path, width):
+        derivative = os.path.join(DEFAULT_DERIVATIVES_DIR, derivative_name(image_path, width, "jpg"))
+        if os.path.isfile(self._path(derivative)):
+            return self._read(derivative)
+        with open(self._path(image_path), "rb") as image_file:
+            if os.fstat(image_file.fileno()).st_size >= self.mmap_threshold:
+                with mmap.mmap(image_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    data = make_variant(mapped, width)
+            else:
+                data = make_variant(image_file.read(), width)
+        self.resized += 1
+        return data
+
+    @staticmethod
+    def _key(image_path, display_width):
+        return image_path if display_width is None else f"{image_path}@{display_width}"
+
+    # Photo bytes, as stored or resized to display_width
+    def get(self, image_path, display_width=None):
+        key = self._key(image_path, display_width)
+        data = self.cache.get(key)
+        if data is None:
+            data = self._read(image_path) if display_width is None else self._variant(image_path, display_width)
+            self.cache.put(key, data)
+        return data
+
+    # Load photos into the cache on a background thread, e.g. the pets ranked first for a visitor
+    def warm(self, image_paths, display_width=None):
+        image_paths = [path for path in image_paths if self.has(path) and self._key(path, display_width) not in self.cache]
+        if not image_paths:
+            return
+
+        def run():
+            for image_path in image_paths:
+                try:
+                    self.get(image_path, display_width)
+                except Exception as e:
+                    logger.warning(f"Failed to warm image {image_path}: {e}")
+
+        threading.Thread(target=run, name="image-warm", daemon=True).start()
+
+    def stats(self):
+        return {**self.cache.stats(), "resized": self.resized}
+
+
+# Return the process-wide provider for the photos bundled under root
+@st.cache_resource
+def get_local_image_provider(root, cache_mb=DEFAULT_CACHE_MB):
+    return LocalImageProvider(root, LRUByteCache(cache_mb * 1024 * 1024))
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+ACTIVITY_LEVELS = {"High": 3, "Medium": 2, "Low": 1}
+
+
+# Parse an adopter's apartment size the same way the original matcher did;
+# typed frames already hold a number, or NA when the cell was empty
+def parse_apartment_size(value):
+    if isinstance(value, str):
+        return float(value) if value.strip() else 0
+    return 0 if pd.isna(value) else float(value)
+
+
+# A Yes/No field, either as sheet text or as a typed boolean (NA counts as No)
+def is_yes(value):
+    if isinstance(value, str):
+        return value == "Yes"
+    return False if pd.isna(value) else bool(value)
+
+
+# Calculate match score between a single adopter and a single pet (reference implementation)
+def calculate_match(adopter, pet):
+    score = 0
+    if adopter["pref_species"] == pet["species"]:
+        score += 0.3
+    if adopter["pref_gender"] in [pet["gender"], "Any"]:
+        score += 0.1
+    if ACTIVITY_LEVELS.get(adopter["activity_level"], 0) >= ACTIVITY_LEVELS.get(pet["activity_level"], 0):
+        score += 0.2
+    if is_yes(adopter["allergy_friendly"]) and is_yes(pet["allergy_friendly"]):
+        score += 0.2
+    space_suitable = False
+    apartment_size = parse_apartment_size(adopter["apartment_size"])
+    if pet["activity_level"] == "Low" or (is_yes(adopter["house"]) or is_yes(adopter["garden"])) or apartment_size >= 50:
+        space_suitable = True
+    if space_suitable and not pet.get("special_needs", ""):
+        score += 0.2
+    return score
+
+
+# Truthiness of every cell in a column, matching Python's bool() on each value
+def _truthy(column):
+    return column.to_numpy(dtype=object).astype(bool)
+
+
+# Boolean mask of cells equal to value; categorical columns compare integer codes
+def _equals(column, value):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        code = column.cat.categories.get_indexer([value])[0] if pd.notna(value) else -1
+        if code < 0:
+            return np.zeros(len(column), dtype=bool)
+        return column.cat.codes.to_numpy() == code
+    return column.to_numpy(dtype=object) == value
+
+
+# Mask of Yes cells in a Yes/No column, text or typed
+def _yes(column):
+    if str(column.dtype) == "boolean":
+        return column.to_numpy(dtype=bool, na_value=False)
+    return _equals(column, "Yes")
+
+
+# Map every cell through a dict, with default for missing keys; categoricals map each category once
+def _lookup(column, mapping, default):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        per_code = np.array([mapping.get(category, default) for category in column.cat.categories] + [default], dtype=np.int64)
+        # Code -1 (missing) picks the trailing default
+        return per_code[column.cat.codes.to_numpy()]
+    return column.map(mapping).fillna(default).to_numpy(dtype=np.int64)
+
+
+# Score every pet in pets_df against one adopter in a single column-wise pass.
+# Terms are added in the same order as calculate_match so the float results are identical.
+def score_pets(adopter, pets_df):
+    n = len(pets_df)
+    scores = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return scores
+
+    activity = pets_df["activity_level"]
+    if "special_needs" in pets_df.columns:
+        no_special_needs = ~_truthy(pets_df["special_needs"])
+    else:
+        no_special_needs = np.ones(n, dtype=bool)
+
+    # Species
+    scores += np.where(_equals(pets_df["species"], adopter["pref_species"]), 0.3, 0.0)
+
+    # Gender; calculate_match's `in` also matches a missing preference to a missing gender
+    if adopter["pref_gender"] == "Any":
+        scores += 0.1
+    elif pd.isna(adopter["pref_gender"]):
+        scores += np.where(pets_df["gender"].isna().to_numpy(), 0.1, 0.0)
+    else:
+        scores += np.where(_equals(pets_df["gender"], adopter["pref_gender"]), 0.1, 0.0)
+
+    # Activity
+    adopter_level = ACTIVITY_LEVELS.get(adopter["activity_level"], 0)
+    pet_levels = _lookup(activity, ACTIVITY_LEVELS, 0)
+    scores += np.where(adopter_level >= pet_levels, 0.2, 0.0)
+
+    # Allergy
+    if is_yes(adopter["allergy_friendly"]):
+        scores += np.where(_yes(pets_df["allergy_friendly"]), 0.2, 0.0)
+
+    # Space and special needs
+    apartment_size = parse_apartment_size(adopter["apartment_size"])
+    if is_yes(adopter["house"]) or is_yes(adopter["garden"]) or apartment_size >= 50:
+        space_suitable = np.ones(n, dtype=bool)
+    else:
+        space_suitable = _equals(activity, "Low")
+    scores += np.where(space_suitable & no_special_needs, 0.2, 0.0)
+
+    return scores
+
+
+# Mask of adopters with room for an active pet: a house, a garden or at least 50 sqm
+def has_space(adopters_df):
+    sizes = adopters_df["apartment_size"].map(parse_apartment_size).to_numpy(dtype=np.float64)
+    return _yes(adopters_df["house"]) | _yes(adopters_df["garden"]) | (sizes >= 50)
+
+
+# Integer codes for the values of two columns, equal where the values are equal; missing values get -1
+def _shared_codes(left, right):
+    codes, _ = pd.factorize(pd.concat([left.astype(object), right.astype(object)], ignore_index=True))
+    return codes[:len(left)], codes[len(left):]
+
+
+# Score every pet against every adopter: a len(pets_df) x len(adopters_df) matrix.
+# Terms are added in the same order as calculate_match so the float results are identical.
+# Memory grows with the product of the two lengths, so callers pass chunks of large tables.
+def score_matrix(pets_df, adopters_df):
+    scores = np.zeros((len(pets_df), len(adopters_df)), dtype=np.float64)
+    if scores.size == 0:
+        return scores
+
+    if "special_needs" in pets_df.columns:
+        no_special_needs = ~_truthy(pets_df["special_needs"])
+    else:
+        no_special_needs = np.ones(len(pets_df), dtype=bool)
+
+    # Species
+    pet_species, preferred_species = _shared_codes(pets_df["species"], adopters_df["pref_species"])
+    scores += np.where((pet_species[:, None] == preferred_species[None, :]) & (pet_species[:, None] >= 0), 0.3, 0.0)
+
+    # Gender; missing codes are equal too, as calculate_match's `in` matches a missing preference to a missing gender
+    pet_gender, preferred_gender = _shared_codes(pets_df["gender"], adopters_df["pref_gender"])
+    gender_match = pet_gender[:, None] == preferred_gender[None, :]
+    scores += np.where(gender_match | _equals(adopters_df["pref_gender"], "Any")[None, :], 0.1, 0.0)
+
+    # Activity
+    pet_levels = _lookup(pets_df["activity_level"], ACTIVITY_LEVELS, 0)
+    adopter_levels = _lookup(adopters_df["activity_level"], ACTIVITY_LEVELS, 0)
+    scores += np.where(adopter_levels[None, :] >= pet_levels[:, None], 0.2, 0.0)
+
+    # Allergy
+    scores += np.where(_yes(adopters_df["allergy_friendly"])[None, :] & _yes(pets_df["allergy_friendly"])[:, None], 0.2, 0.0)
+
+    # Space and special needs
+    space_suitable = _equals(pets_df["activity_level"], "Low")[:, None] | has_space(adopters_df)[None, :]
+    scores += np.where(space_suitable & no_special_needs[:, None], 0.2, 0.0)
+
+    return scores
+
+
+# Positions of the k best scores, highest first. Ties keep their original order,
+# which is what a stable sort on the score would give. k=None ranks everything.
+def top_k(scores, k=None):
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    # Partial selection finds the k-th best score; everything above it is in,
+    # and ties at the threshold are filled in position order
+    threshold = scores[np.argpartition(-scores, k - 1)[k - 1]]
+    above = np.flatnonzero(scores > threshold)
+    at_threshold = np.flatnonzero(scores == threshold)[:k - len(above)]
+    selected = np.concatenate([above, at_threshold])
+    return selected[np.lexsort((selected, -scores[selected]))]
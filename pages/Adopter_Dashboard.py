@@ -1,13 +1,23 @@
 import os
 os.environ["GOOGLE_API_USE_CLIENT_CERTIFICATE"] = "true"
 
+import time
+script_started = time.perf_counter()
+
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 import logging
-import time
+from data_store import get_data_store, DEFAULT_TTL_SECONDS
+from snapshot_cache import DEFAULT_SNAPSHOT_DIR
+from sheet_writes import ChangeSet
+from storage import get_storage_backend
+from google_clients import get_google_clients
+from startup_timing import get_startup_timer
+from drive_images import get_drive_image_index
+from image_pipeline import derivative_candidates
+from image_prefetch import get_image_prefetcher, get_lookahead
+from interaction_queue import get_interaction_queue
+from recommendations import get_recommendation_store
+from liked_pets import DEFAULT_PAGE_SIZE, format_phone, liked_pets_page, page_count, shelter_contacts
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -18,224 +28,149 @@ if "user" not in st.session_state:
 if "user_type" not in st.session_state:
     st.session_state.user_type = None
 
-# Load credentials and initialize Google Sheets and Drive clients
+storage_config = st.secrets.get("storage", {})
+
+# Google Sheets and Drive clients, shared by every page and session. The credentials are loaded
+# here and the clients are built on first use; every request goes through one process-wide rate limiter.
 try:
-    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    credentials_info = st.secrets["gcp_service_account"]
-    credentials = Credentials.from_service_account_info(credentials_info, scopes=scopes)
-    gc = gspread.authorize(credentials)
-    drive_service = build("drive", "v3", credentials=credentials)
+    google_clients = get_google_clients()
+    gc = google_clients.gc
+    drive_service = google_clients.drive_service
 except Exception as e:
     logger.error(f"Failed to load credentials: {e}")
-    st.error(f"Error loading Google API credentials: {e}")
-    st.stop()
+    if storage_config.get("backend", "sheets") == "sheets":
+        st.error(f"Error loading Google API credentials: {e}")
+        st.stop()
+    # Local storage can run without Google; only Drive images are unavailable
+    gc = None
+    drive_service = None
+    st.warning("Google APIs are unavailable, running from local storage without Drive images.")
 
-# Load data from Google Sheets
+# Process-wide storage backend (Google Sheets or local SQLite)
+storage = get_storage_backend(gc, drive_service)
+
+# Shared, TTL-cached data store for all pages and sessions
+cache_config = st.secrets.get("cache", {})
+data_store = get_data_store(
+    storage.load_tables,
+    ttl_seconds=cache_config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+    snapshot_dir=os.path.join(cache_config.get("snapshot_dir", DEFAULT_SNAPSHOT_DIR), storage.name) if storage.remote else None
+)
+
+# Load data from the shared store. The frames are the cache's own, shared by every session,
+# so handlers copy a frame before changing it in place. When the store's version moved on since
+# this session last loaded, the logged-in adopter's row is read again.
 def load_data():
-    try:
-        time.sleep(3)  # Delay to avoid rate limits
-        sheets = {}
-        sheet_configs = {
-            "pets": st.secrets["gcp"]["sheets_pets_id"],
-            "adopters": st.secrets["gcp"]["sheets_adopters_id"],
-            "shelters": st.secrets["gcp"]["sheets_shelters_id"]
-        }
-        
-        # Initialize sheets with detailed error handling
-        for sheet_name, sheet_id in sheet_configs.items():
-            try:
-                spreadsheet = gc.open_by_key(sheet_id)
-                sheets[sheet_name] = spreadsheet.sheet1
-                logger.info(f"Successfully accessed {sheet_name} sheet (ID: {sheet_id})")
-            except gspread.exceptions.SpreadsheetNotFound as snf_err:
-                logger.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}): {str(snf_err)}")
-                st.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}). Please check the Sheet ID and permissions.")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-            except gspread.exceptions.APIError as api_err:
-                logger.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {api_err.response.get('error', {}).get('message', str(api_err))}")
-                st.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {api_err.response.get('error', {}).get('message', str(api_err))}")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-            except Exception as e:
-                logger.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
-                st.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        
-        # Fetch data with retry logic and detailed error handling
-        max_retries = 3
-        dataframes = {}
-        for sheet_name in ["pets", "adopters", "shelters"]:
-            for attempt in range(max_retries):
-                try:
-                    # Fetch raw data as a list of lists to inspect
-                    raw_data = sheets[sheet_name].get_all_values()
-                    if not raw_data:
-                        raise ValueError(f"No data found in {sheet_name} sheet")
-                    # Convert to DataFrame manually to handle encoding
-                    headers = raw_data[0]
-                    data = raw_data[1:]
-                    df = pd.DataFrame(data, columns=headers)
-                    dataframes[sheet_name] = df
-                    logger.info(f"Successfully loaded {sheet_name} data with {len(df)} rows")
-                    break
-                except gspread.exceptions.APIError as api_err:
-                    if api_err.response.get('error', {}).get('code') == 429:  # Rate limit
-                        logger.warning(f"Rate limit hit for {sheet_name} on attempt {attempt + 1}, retrying...")
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        if attempt == max_retries - 1:
-                            raise api_err
-                    else:
-                        raise api_err
-                except Exception as e:
-                    logger.error(f"Failed to load {sheet_name} data on attempt {attempt + 1}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        raise e
-        
-        pets_df = dataframes["pets"]
-        adopters_df = dataframes["adopters"]
-        shelters_df = dataframes["shelters"]
-        
-        # Validate column existence
-        required_columns = {
-            "pets": ["pet_id", "species", "breed", "gender", "name"],
-            "adopters": ["adopter_id", "username", "password", "name"],
-            "shelters": ["shelter_id", "username", "password", "name"]
-        }
-        for df_name, df in [("pets", pets_df), ("adopters", adopters_df), ("shelters", shelters_df)]:
-            if df.empty or not all(col in df.columns for col in required_columns[df_name]):
-                logger.error(f"{df_name.capitalize()} DataFrame is empty or missing columns: {required_columns[df_name]}")
-                st.error(f"{df_name.capitalize()} data is missing or malformed. Please check the Google Sheet.")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        
-        logger.info("Data loaded successfully from Google Sheets")
-        return pets_df, adopters_df, shelters_df
-    except gspread.exceptions.APIError as api_err:
-        logger.error(f"API Error loading data from Google Sheets: {api_err.response.get('error', {}).get('message', str(api_err))}")
-        st.error(f"API Error loading data from Google Sheets: {api_err.response.get('error', {}).get('message', str(api_err))}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    except gspread.exceptions.WorksheetNotFound as wnf_err:
-        logger.error(f"Worksheet not found: {str(wnf_err)}")
-        st.error(f"Worksheet not found in Google Sheet. Ensure the tab is named 'Sheet1': {str(wnf_err)}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    except Exception as e:
-        logger.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
-        st.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    snapshot = data_store.get()
+    if st.session_state.get("data_version") != snapshot.version:
+        user = st.session_state.user
+        if user is not None and st.session_state.user_type == "Adopter":
+            rows = snapshot.adopters[snapshot.adopters["adopter_id"] == user.get("adopter_id")]
+            if not rows.empty:
+                st.session_state.user = rows.iloc[0].to_dict()
+        st.session_state.data_version = snapshot.version
+    if snapshot.read_only:
+        st.warning("Showing the last saved copy of the data while Google Sheets is loading or unreachable. Changes can't be saved right now.")
+    return snapshot.pets, snapshot.adopters, snapshot.shelters, snapshot.pet_index, snapshot.interaction_index
+
+pets_df, adopters_df, shelters_df, pet_index, interaction_index = load_data()
+
+# Process-wide write-behind queue for like/skip clicks
+interaction_queue = get_interaction_queue(storage, data_store)
 
-pets_df, adopters_df, shelters_df = load_data()
+# Rows and cells changed during this run, flushed by save_data()
+changes = ChangeSet()
 
-# Save data to Google Sheets
+# Save changed rows and cells to storage
 def save_data():
-    global pets_df, adopters_df, shelters_df
+    global pets_df, adopters_df, shelters_df, pet_index, interaction_index
+    if not changes:
+        return
+    if data_store.get().read_only:
+        st.error("Google Sheets is unreachable, so changes can't be saved right now. Please try again shortly.")
+        return
     try:
-        gc.open_by_key(st.secrets["gcp"]["sheets_pets_id"]).sheet1.update([pets_df.columns.values.tolist()] + pets_df.values.tolist())
-        gc.open_by_key(st.secrets["gcp"]["sheets_adopters_id"]).sheet1.update([adopters_df.columns.values.tolist()] + adopters_df.values.tolist())
-        gc.open_by_key(st.secrets["gcp"]["sheets_shelters_id"]).sheet1.update([shelters_df.columns.values.tolist()] + shelters_df.values.tolist())
-        # Reload data to reflect changes
-        pets_df, adopters_df, shelters_df = load_data()
+        frames = {"pets": pets_df, "adopters": adopters_df, "shelters": shelters_df, "interactions": data_store.get().interactions}
+        storage.write_changes(changes, frames, data_store.get())
+        # Fold the written changes into the shared cache instead of refetching
+        data_store.apply_changes(changes, frames)
+        changes.clear()
+        pets_df, adopters_df, shelters_df, pet_index, interaction_index = load_data()
     except Exception as e:
         logger.error(f"Failed to save data to Google Sheets: {e}")
         st.error(f"Error saving data to Google Sheets: {e}")
+        # A partial write leaves the cache out of step with storage
+        data_store.invalidate()
 
 # Get image URL from Google Drive
 def get_image_url(file_id):
     return f"https://drive.google.com/uc?id={file_id}"
 
-# Get image URL by searching for the file name in the Drive folder
-def get_drive_image_url(image_path):
+# Process-wide name -> file id index for the Drive image folder
+drive_images = get_drive_image_index(drive_service, st.secrets["gcp"]["drive_folder_id"]) if drive_service is not None else None
+
+# Get image URLs by looking the file names up in the Drive folder index, all in one lookup.
+# With a display width, the smallest resized derivative that fits is preferred over the original.
+def get_drive_image_urls(image_paths, display_width=None):
+    urls = {image_path: image_path for image_path in image_paths if image_path and "drive.google.com" in image_path}
+    drive_paths = [image_path for image_path in image_paths if image_path and image_path not in urls]
     try:
-        if image_path and "drive.google.com" not in image_path:
-            query = f"'{st.secrets['gcp']['drive_folder_id']}' in parents and name = '{image_path}'"
-            results = drive_service.files().list(q=query, fields="files(id)").execute()
-            files = results.get("files", [])
-            return get_image_url(files[0]["id"]) if files else None
-        return image_path
+        if drive_paths and drive_images is not None:
+            candidates = {image_path: (derivative_candidates(image_path, display_width) if display_width else []) + [image_path] for image_path in drive_paths}
+            file_ids = drive_images.lookup_many([name for names in candidates.values() for name in names])
+            for image_path, names in candidates.items():
+                file_id = next((file_ids[name] for name in names if file_ids[name]), None)
+                urls[image_path] = get_image_url(file_id) if file_id else None
     except Exception as e:
-        logger.error(f"Failed to get image URL from Google Drive: {e}")
-        return None
-
-# Matching function
-def calculate_match(adopter, pet):
-    score = 0
-    if adopter["pref_species"] == pet["species"]:
-        score += 0.3
-    if adopter["pref_gender"] in [pet["gender"], "Any"]:
-        score += 0.1
-    activity_levels = {"High": 3, "Medium": 2, "Low": 1}
-    if activity_levels.get(adopter["activity_level"], 0) >= activity_levels.get(pet["activity_level"], 0):
-        score += 0.2
-    if adopter["allergy_friendly"] == "Yes" and pet["allergy_friendly"] == "Yes":
-        score += 0.2
-    space_suitable = False
-    apartment_size = float(adopter["apartment_size"]) if adopter["apartment_size"] and str(adopter["apartment_size"]).strip() else 0
-    if pet["activity_level"] == "Low" or (adopter["house"] == "Yes" or adopter["garden"] == "Yes") or apartment_size >= 50:
-        space_suitable = True
-    if space_suitable and not pet["special_needs"]:
-        score += 0.2
-    return score
-
-# Get recommendations
-def get_recommendations(adopter_id):
-    global adopters_df, pets_df
-    adopter = adopters_df[adopters_df["adopter_id"] == adopter_id].iloc[0]
-    liked_pets = []
-    skipped_pets = []
-    if isinstance(adopter.get("liked_pets"), str) and adopter["liked_pets"].strip():
-        liked_pets = adopter["liked_pets"].split(",")
-    if isinstance(adopter.get("skipped_pets"), str) and adopter["skipped_pets"].strip():
-        skipped_pets = adopter["skipped_pets"].split(",")
-    excluded_pets = liked_pets + skipped_pets
-    scores = []
-    for _, pet in pets_df.iterrows():
-        if pet["pet_id"] not in excluded_pets:
-            score = calculate_match(adopter, pet)
-            scores.append((pet["pet_id"], score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    top_pets = [pets_df[pets_df["pet_id"] == pet_id].iloc[0] for pet_id, _ in scores[:5]]
-    return top_pets
+        logger.error(f"Failed to get image URLs from Google Drive: {e}")
+    return {image_path: urls.get(image_path) for image_path in image_paths}
+
+# Get the image URL of a single file name
+def get_drive_image_url(image_path, display_width=None):
+    return get_drive_image_urls([image_path], display_width)[image_path]
+
+# Process-wide prefetcher that keeps upcoming recommendation photos in memory
+image_prefetcher = get_image_prefetcher(lambda image_path: get_drive_image_url(image_path, display_width=300))
+
+# Process-wide ranked recommendations, shared across sessions and patched as pets change
+recommendation_store = get_recommendation_store(data_store)
+
+# Get the next recommendations from the adopter's stored ranking
+def get_recommendations(adopter_id, limit):
+    snapshot = data_store.get()
+    pet_ids = recommendation_store.page(snapshot, adopter_id, limit)
+    return [snapshot.pets.iloc[snapshot.pet_index[pet_id]] for pet_id in pet_ids if pet_id in snapshot.pet_index]
 
 # Like a pet
 def like_pet(adopter_id, pet_id):
-    global adopters_df
-    adopter_idx = adopters_df.index[adopters_df["adopter_id"] == adopter_id].tolist()[0]
-    current_likes = adopters_df.at[adopter_idx, "liked_pets"]
-    likes_list = []
-    if isinstance(current_likes, str) and current_likes.strip():
-        likes_list = current_likes.split(",")
-    if pet_id not in likes_list:
-        likes_list.append(pet_id)
-        adopters_df.at[adopter_idx, "liked_pets"] = ",".join(likes_list)
-    save_data()
-    # Update session state user
-    st.session_state.user = adopters_df.iloc[adopter_idx].to_dict()
-    pet = pets_df[pets_df["pet_id"] == pet_id].iloc[0]
-    shelter = shelters_df[shelters_df["name"] == pet["sheltername"]].iloc[0]
-    phone = str(shelter["phone"]).strip() if shelter["phone"] and str(shelter["phone"]).strip() else "Not provided"
-    if phone and phone != "Not provided" and len(phone) >= 3 and phone.isdigit():
-        formatted_phone = f"+{phone[:3]} {phone[3:]}"
-    else:
-        formatted_phone = phone
-    return f"{pet['name']} was liked by you. The contact information of the shelter located in {shelter['address']} is phone number {formatted_phone} and email {shelter['email']}. Please don't hesitate to contact them!"
+    global pets_df, adopters_df, shelters_df, pet_index, interaction_index
+    # Queued for a batched sheet write; the shared cache reflects it immediately
+    interaction_queue.enqueue(adopter_id, pet_id, "like")
+    pets_df, adopters_df, shelters_df, pet_index, interaction_index = load_data()
+    pet = pets_df.iloc[pet_index[pet_id]]
+    shelter_id = pet.get("shelter_id")
+    shelter = shelters_df[shelters_df["shelter_id"] == shelter_id] if shelter_id else shelters_df[shelters_df["name"] == pet["sheltername"]]
+    shelter = shelter.iloc[0]
+    return f"{pet['name']} was liked by you. The contact information of the shelter located in {shelter['address']} is phone number {format_phone(shelter['phone'])} and email {shelter['email']}. Please don't hesitate to contact them!"
 
 # Skip a pet
 def skip_pet(adopter_id, pet_id):
-    global adopters_df
-    adopter_idx = adopters_df.index[adopters_df["adopter_id"] == adopter_id].tolist()[0]
-    current_skips = adopters_df.at[adopter_idx, "skipped_pets"]
-    skips_list = []
-    if isinstance(current_skips, str) and current_skips.strip():
-        skips_list = current_skips.split(",")
-    if pet_id not in skips_list:
-        skips_list.append(pet_id)
-        adopters_df.at[adopter_idx, "skipped_pets"] = ",".join(skips_list)
-    save_data()
-    # Update session state user
-    st.session_state.user = adopters_df.iloc[adopter_idx].to_dict()
-    return f"{pets_df[pets_df['pet_id'] == pet_id].iloc[0]['name']} has been skipped."
+    global pets_df, adopters_df, shelters_df, pet_index, interaction_index
+    # Queued for a batched sheet write; the shared cache reflects it immediately
+    interaction_queue.enqueue(adopter_id, pet_id, "skip")
+    pets_df, adopters_df, shelters_df, pet_index, interaction_index = load_data()
+    return f"{pets_df.iloc[pet_index[pet_id]]['name']} has been skipped."
 
 # Delete adopter account
 def delete_adopter_account(adopter_id):
     global adopters_df
     adopters_df = adopters_df[adopters_df["adopter_id"] != adopter_id]
+    changes.delete("adopters", adopter_id)
+    # Queued clicks are dropped rather than written; only rows storage holds are deleted
+    interaction_queue.discard_adopter(adopter_id)
+    interactions_df = data_store.get().interactions
+    for key in interactions_df.loc[interactions_df["adopter_id"] == adopter_id, "interaction_id"]:
+        changes.delete("interactions", key)
     save_data()
     return "Adopter account deleted successfully"
 
@@ -290,7 +225,7 @@ st.markdown("### Join Our Pet Adoption Community! 🐾")
 st.markdown("Find your furry friend or help pets find loving homes with our platform! ❤️")
 
 # Display image from Google Drive
-drive_url = get_drive_image_url("f2.jpg")
+drive_url = get_drive_image_url("f2.jpg", display_width=300)
 if drive_url:
     st.image(drive_url, caption="Loving Homes", width=300)
 else:
@@ -303,9 +238,6 @@ else:
     user = st.session_state.user
     st.subheader(f"Welcome, {user['name']}")
 
-    # Initialize session state for recommendation index
-    if "recommendation_index" not in st.session_state:
-        st.session_state.recommendation_index = 0
     if "show_contact_message" not in st.session_state:
         st.session_state.show_contact_message = False
     if "contact_message" not in st.session_state:
@@ -316,25 +248,24 @@ else:
 
     if option == "View Recommended Pets":
         st.subheader("Recommended Pets")
-        pets_df, adopters_df, shelters_df = load_data()
-        
+        # The current card plus the upcoming ones; liked and skipped pets drop out of the ranking
+        recommendations = get_recommendations(user["adopter_id"], 1 + get_lookahead())
+
         if not recommendations:
             st.info("No more pets to recommend.")
-        elif st.session_state.recommendation_index >= len(recommendations):
-            st.info("No more pets to recommend.")
         else:
             if not st.session_state.show_contact_message:
-                pet = recommendations[st.session_state.recommendation_index]
+                pet = recommendations[0]
+                # Fetch the next cards' photos in the background while this one is shown
+                upcoming = recommendations[1:]
+                image_prefetcher.prefetch([upcoming_pet.get("image_path", "") for upcoming_pet in upcoming])
                 col1, col2 = st.columns([1, 3])
                 with col1:
                     st.markdown("<div class='image-column'>", unsafe_allow_html=True)
                     image_path = pet.get("image_path", "")
-                    if image_path:
-                        drive_url = get_drive_image_url(image_path)
-                        if drive_url:
-                            st.image(drive_url, caption=pet["name"], width=300)
-                        else:
-                            st.write("No image available")
+                    image_bytes = image_prefetcher.get(image_path) if image_path else None
+                    if image_bytes:
+                        st.image(image_bytes, caption=pet["name"], width=300)
                     else:
                         st.write("No image available")
                     st.markdown(f"<div class='pet-description'>{pet['name']} ({pet['species']}, {pet['breed']}, {pet['gender']}, Age: {pet['age']})</div>", unsafe_allow_html=True)
@@ -348,12 +279,10 @@ else:
                                 message = like_pet(user["adopter_id"], pet["pet_id"])
                                 st.session_state.show_contact_message = True
                                 st.session_state.contact_message = message
-                                st.session_state.recommendation_index += 1
                                 st.rerun()
                         with col_skip:
                             if st.button(f"Skip {pet['name']}", key=f"skip_{pet['pet_id']}"):
                                 message = skip_pet(user["adopter_id"], pet["pet_id"])
-                                st.session_state.recommendation_index += 1
                                 st.info(message)
                                 st.rerun()
                         st.markdown("</div>", unsafe_allow_html=True)
@@ -365,50 +294,32 @@ else:
 
     elif option == "View Liked Pets":
         st.subheader("Liked Pets")
-        pets_df, adopters_df, shelters_df = load_data()
-        # Refresh user from adopters_df to ensure latest data
-        user = adopters_df[adopters_df["adopter_id"] == user["adopter_id"]].iloc[0]
-        st.session_state.user = user.to_dict()
-        liked_pets = []
-        if isinstance(user.get("liked_pets"), str) and user["liked_pets"].strip():
-            liked_pets = user["liked_pets"].split(",")
-        if not liked_pets or liked_pets == [""]:
+        liked_pets = interaction_index.liked(user["adopter_id"])
+        if not liked_pets:
             st.info("No liked pets yet.")
         else:
-            for pet_id in liked_pets:
-                if pet_id:
-                    pet_data = pets_df[pets_df["pet_id"] == pet_id]
-                    if not pet_data.empty:
-                        pet = pet_data.iloc[0]
-                        shelter_data = shelters_df[shelters_df["name"] == pet["sheltername"]]
-                        if not shelter_data.empty:
-                            shelter = shelter_data.iloc[0]
-                            phone = str(shelter["phone"]).strip() if shelter["phone"] and str(shelter["phone"]).strip() else "Not provided"
-                            if phone and phone != "Not provided" and len(phone) >= 3 and phone.isdigit():
-                                formatted_phone = f"+{phone[:3]} {phone[3:]}"
-                            else:
-                                formatted_phone = phone
-                            col1, col2 = st.columns([1, 3])
-                            with col1:
-                                image_path = pet.get("image_path", "")
-                                if image_path:
-                                    drive_url = get_drive_image_url(image_path)
-                                    if drive_url:
-                                        st.image(drive_url, caption=pet["name"], width=300)
-                                    else:
-                                        st.write("No image available")
-                                else:
-                                    st.write("No image available")
-                            with col2:
-                                st.write(f"**{pet['name']}** ({pet['species']}, {pet['breed']}, {pet['gender']}, Age: {pet['age']})")
-                                st.write(f"**Shelter**: {shelter['name']}")
-                                st.write(f"**Address**: {shelter['address']}")
-                                st.write(f"**Phone**: {formatted_phone}")
-                                st.write(f"**Email**: {shelter['email']}")
+            page_size = st.secrets.get("liked_pets", {}).get("page_size", DEFAULT_PAGE_SIZE)
+            pages = page_count(liked_pets, page_size)
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1) if pages > 1 else 1
+            # The page's pets joined with their shelters, and their photos resolved in one lookup
+            liked_rows, missing = liked_pets_page(liked_pets, pets_df, pet_index, shelter_contacts(shelters_df), int(page), page_size)
+            image_urls = get_drive_image_urls(liked_rows["image_path"].tolist(), display_width=300) if "image_path" in liked_rows.columns else {}
+            for pet in liked_rows.to_dict("records"):
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    drive_url = image_urls.get(pet.get("image_path", ""))
+                    if drive_url:
+                        st.image(drive_url, caption=pet["name"], width=300)
                     else:
-                        st.warning(f"Pet with ID {pet_id} no longer available.")
-                else:
-                    st.warning("Invalid pet ID in liked pets.")
+                        st.write("No image available")
+                with col2:
+                    st.write(f"**{pet['name']}** ({pet['species']}, {pet['breed']}, {pet['gender']}, Age: {pet['age']})")
+                    st.write(f"**Shelter**: {pet['shelter_name']}")
+                    st.write(f"**Address**: {pet['shelter_address']}")
+                    st.write(f"**Phone**: {pet['shelter_phone']}")
+                    st.write(f"**Email**: {pet['shelter_email']}")
+            for pet_id in missing:
+                st.warning(f"Pet with ID {pet_id} no longer available.")
 
     elif option == "Delete Account":
         st.subheader("Delete Account")
@@ -417,4 +328,7 @@ else:
             st.success(message)
             st.session_state.user = None
             st.session_state.user_type = None
-            st.switch_page("app.py")
\ No newline at end of file
+            st.switch_page("app.py")
+
+# Log how long a fresh process took to render this page
+get_startup_timer().page_rendered("Adopter Dashboard", script_started)
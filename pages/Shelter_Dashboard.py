@@ -1,16 +1,25 @@
 import os
 os.environ["GOOGLE_API_USE_CLIENT_CERTIFICATE"] = "true"
 
+import time
+script_started = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
 import uuid
-from googleapiclient.http import MediaIoBaseUpload
-import io
 import logging
-import time
+from data_store import get_data_store, DEFAULT_TTL_SECONDS
+from snapshot_cache import DEFAULT_SNAPSHOT_DIR
+from sheet_writes import ChangeSet
+from adopter_matching import DEFAULT_TOP_ADOPTERS, rank_adopters
+from schema import set_row_values
+from storage import get_storage_backend
+from google_clients import get_google_clients
+from startup_timing import get_startup_timer
+from drive_images import get_drive_image_index
+from image_pipeline import make_derivatives, upload_derivatives
+from drive_uploads import detect_mime_type, extension_for, upload_resumable
+from pet_import import DEFAULT_UPLOAD_WORKERS, PhotoUploader, open_photo_zip, validate_import, zip_photos
 
 
 # Set up logging
@@ -22,155 +31,192 @@ if "user" not in st.session_state:
 if "user_type" not in st.session_state:
     st.session_state.user_type = None
 
-# Load credentials and initialize Google Sheets and Drive clients
+storage_config = st.secrets.get("storage", {})
+
+# Google Sheets and Drive clients, shared by every page and session. The credentials are loaded
+# here and the clients are built on first use; every request goes through one process-wide rate limiter.
 try:
-    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    credentials_info = st.secrets["gcp_service_account"]
-    credentials = Credentials.from_service_account_info(credentials_info, scopes=scopes)
-    gc = gspread.authorize(credentials)
-    drive_service = build("drive", "v3", credentials=credentials)
+    google_clients = get_google_clients()
+    gc = google_clients.gc
+    drive_service = google_clients.drive_service
 except Exception as e:
     logger.error(f"Failed to load credentials: {e}")
-    st.error(f"Error loading Google API credentials: {e}")
-    st.stop()
+    if storage_config.get("backend", "sheets") == "sheets":
+        st.error(f"Error loading Google API credentials: {e}")
+        st.stop()
+    # Local storage can run without Google; only Drive images are unavailable
+    gc = None
+    drive_service = None
+    st.warning("Google APIs are unavailable, running from local storage without Drive images.")
+
+# Process-wide storage backend (Google Sheets or local SQLite)
+storage = get_storage_backend(gc, drive_service)
+
+# Shared, TTL-cached data store for all pages and sessions
+cache_config = st.secrets.get("cache", {})
+data_store = get_data_store(
+    storage.load_tables,
+    ttl_seconds=cache_config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+    snapshot_dir=os.path.join(cache_config.get("snapshot_dir", DEFAULT_SNAPSHOT_DIR), storage.name) if storage.remote else None
+)
 
-# Load data from Google Sheets
+# Load data from the shared store. The frames are the cache's own, shared by every session,
+# so handlers copy a frame before changing it in place. When the store's version moved on since
+# this session last loaded, the logged-in shelter's row is read again.
 def load_data():
-    try:
-        time.sleep(3)  # Delay to avoid rate limits
-        sheets = {}
-        sheet_configs = {
-            "pets": st.secrets["gcp"]["sheets_pets_id"],
-            "adopters": st.secrets["gcp"]["sheets_adopters_id"],
-            "shelters": st.secrets["gcp"]["sheets_shelters_id"]
-        }
-        
-        # Initialize sheets with detailed error handling
-        for sheet_name, sheet_id in sheet_configs.items():
-            try:
-                spreadsheet = gc.open_by_key(sheet_id)
-                sheets[sheet_name] = spreadsheet.sheet1
-                logger.info(f"Successfully accessed {sheet_name} sheet (ID: {sheet_id})")
-            except gspread.exceptions.SpreadsheetNotFound as snf_err:
-                logger.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}): {str(snf_err)}")
-                st.error(f"Spreadsheet not found for {sheet_name} (ID: {sheet_id}). Please check the Sheet ID and permissions.")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-            except gspread.exceptions.APIError as api_err:
-                logger.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {api_err.response.get('error', {}).get('message', str(api_err))}")
-                st.error(f"API Error accessing {sheet_name} (ID: {sheet_id}): {api_err.response.get('error', {}).get('message', str(api_err))}")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-            except Exception as e:
-                logger.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
-                st.error(f"Unexpected error accessing {sheet_name} (ID: {sheet_id}): {str(e)}")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        
-        # Fetch data with retry logic and detailed error handling
-        max_retries = 3
-        dataframes = {}
-        for sheet_name in ["pets", "adopters", "shelters"]:
-            for attempt in range(max_retries):
-                try:
-                    # Fetch raw data as a list of lists to inspect
-                    raw_data = sheets[sheet_name].get_all_values()
-                    if not raw_data:
-                        raise ValueError(f"No data found in {sheet_name} sheet")
-                    # Convert to DataFrame manually to handle encoding
-                    headers = raw_data[0]
-                    data = raw_data[1:]
-                    df = pd.DataFrame(data, columns=headers)
-                    dataframes[sheet_name] = df
-                    logger.info(f"Successfully loaded {sheet_name} data with {len(df)} rows")
-                    break
-                except gspread.exceptions.APIError as api_err:
-                    if api_err.response.get('error', {}).get('code') == 429:  # Rate limit
-                        logger.warning(f"Rate limit hit for {sheet_name} on attempt {attempt + 1}, retrying...")
-                        time.sleep(2 ** attempt)  # Exponential backoff
-                        if attempt == max_retries - 1:
-                            raise api_err
-                    else:
-                        raise api_err
-                except Exception as e:
-                    logger.error(f"Failed to load {sheet_name} data on attempt {attempt + 1}: {str(e)}")
-                    if attempt == max_retries - 1:
-                        raise e
-        
-        pets_df = dataframes["pets"]
-        adopters_df = dataframes["adopters"]
-        shelters_df = dataframes["shelters"]
-        
-        # Validate column existence
-        required_columns = {
-            "pets": ["pet_id", "species", "breed", "gender", "name"],
-            "adopters": ["adopter_id", "username", "password", "name"],
-            "shelters": ["shelter_id", "username", "password", "name"]
-        }
-        for df_name, df in [("pets", pets_df), ("adopters", adopters_df), ("shelters", shelters_df)]:
-            if df.empty or not all(col in df.columns for col in required_columns[df_name]):
-                logger.error(f"{df_name.capitalize()} DataFrame is empty or missing columns: {required_columns[df_name]}")
-                st.error(f"{df_name.capitalize()} data is missing or malformed. Please check the Google Sheet.")
-                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-        
-        logger.info("Data loaded successfully from Google Sheets")
-        return pets_df, adopters_df, shelters_df
-    except gspread.exceptions.APIError as api_err:
-        logger.error(f"API Error loading data from Google Sheets: {api_err.response.get('error', {}).get('message', str(api_err))}")
-        st.error(f"API Error loading data from Google Sheets: {api_err.response.get('error', {}).get('message', str(api_err))}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    except gspread.exceptions.WorksheetNotFound as wnf_err:
-        logger.error(f"Worksheet not found: {str(wnf_err)}")
-        st.error(f"Worksheet not found in Google Sheet. Ensure the tab is named 'Sheet1': {str(wnf_err)}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-    except Exception as e:
-        logger.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
-        st.error(f"Unexpected error loading data from Google Sheets: {str(e)}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+    snapshot = data_store.get()
+    if st.session_state.get("data_version") != snapshot.version:
+        user = st.session_state.user
+        if user is not None and st.session_state.user_type == "Shelter":
+            rows = snapshot.shelters[snapshot.shelters["shelter_id"] == user.get("shelter_id")]
+            if not rows.empty:
+                st.session_state.user = rows.iloc[0].to_dict()
+        st.session_state.data_version = snapshot.version
+    if snapshot.read_only:
+        st.warning("Showing the last saved copy of the data while Google Sheets is loading or unreachable. Changes can't be saved right now.")
+    return snapshot.pets, snapshot.adopters, snapshot.shelters, snapshot.pet_index, snapshot.shelter_partitions
+
+pets_df, adopters_df, shelters_df, pet_index, shelter_partitions = load_data()
 
-pets_df, adopters_df, shelters_df = load_data()
+# Rows and cells changed during this run, flushed by save_data()
+changes = ChangeSet()
 
-# Save data to Google Sheets
+# Save changed rows and cells to storage
 def save_data():
-    global pets_df, adopters_df, shelters_df
+    global pets_df, adopters_df, shelters_df, pet_index, shelter_partitions
+    if not changes:
+        return
+    if data_store.get().read_only:
+        st.error("Google Sheets is unreachable, so changes can't be saved right now. Please try again shortly.")
+        return
     try:
-        gc.open_by_key(st.secrets["gcp"]["sheets_pets_id"]).sheet1.update([pets_df.columns.values.tolist()] + pets_df.values.tolist())
-        gc.open_by_key(st.secrets["gcp"]["sheets_adopters_id"]).sheet1.update([adopters_df.columns.values.tolist()] + adopters_df.values.tolist())
-        gc.open_by_key(st.secrets["gcp"]["sheets_shelters_id"]).sheet1.update([shelters_df.columns.values.tolist()] + shelters_df.values.tolist())
-        # Reload data to reflect changes
-        pets_df, adopters_df, shelters_df = load_data()
+        frames = {"pets": pets_df, "adopters": adopters_df, "shelters": shelters_df}
+        storage.write_changes(changes, frames, data_store.get())
+        # Fold the written changes into the shared cache instead of refetching
+        data_store.apply_changes(changes, frames)
+        changes.clear()
+        pets_df, adopters_df, shelters_df, pet_index, shelter_partitions = load_data()
     except Exception as e:
         logger.error(f"Failed to save data to Google Sheets: {e}")
         st.error(f"Error saving data to Google Sheets: {e}")
+        # A partial write leaves the cache out of step with storage
+        data_store.invalidate()
 
 # Get image URL from Google Drive
 def get_image_url(file_id):
     return f"https://drive.google.com/uc?id={file_id}"
 
-# Upload photo to Google Drive
+# Upload photo to Google Drive in resumable chunks; returns (file id, file name)
 def upload_photo(pet_id, file):
     try:
         if file is not None:
-            file_metadata = {"name": f"{pet_id}.jpg", "parents": [st.secrets["gcp"]["drive_folder_id"]]}
-            media = MediaIoBaseUpload(io.BytesIO(file.read()), mimetype="image/jpeg")
-            file = drive_service.files().create(body=file_metadata, media_body=media, fields="id").execute()
-            return file.get("id")
-        return None
+            if drive_service is None:
+                st.warning("Google Drive is unavailable, the photo was not uploaded.")
+                return None, None
+            folder_id = st.secrets["gcp"]["drive_folder_id"]
+            image_index = get_drive_image_index(drive_service, folder_id)
+            mime_type = detect_mime_type(file)
+            file_name = f"{pet_id}{extension_for(mime_type)}"
+            progress_bar = st.progress(0.0, text=f"Uploading {file_name}...")
+            file_id = upload_resumable(
+                drive_service, file, file_name, folder_id, mime_type,
+                progress=lambda fraction: progress_bar.progress(fraction, text=f"Uploading {file_name}... {fraction:.0%}")
+            )
+            progress_bar.empty()
+            # Make the new photo resolvable everywhere without another listing
+            image_index.add(file_name, file_id)
+            # Resized copies so the dashboards don't serve the full-size original
+            try:
+                file.seek(0)
+                upload_derivatives(drive_service, folder_id, make_derivatives(file, file_name), image_index)
+            except Exception as e:
+                logger.error(f"Failed to create resized copies for {pet_id}: {e}")
+            return file_id, file_name
+        return None, None
     except Exception as e:
         logger.error(f"Failed to upload photo to Google Drive: {e}")
         st.error(f"Error uploading photo to Google Drive: {e}")
-        return None
+        return None, None
 
-# Add pet
-def add_pet(data, shelter_id):
+# Add pet; shelter is the logged-in shelter's row
+def add_pet(data, shelter):
     global pets_df
     data["pet_id"] = f"PET{uuid.uuid4().hex[:6].upper()}"
-    data["sheltername"] = shelters_df[shelters_df["shelter_id"] == shelter_id].iloc[0]["name"]
+    data["shelter_id"] = shelter["shelter_id"]
+    data["sheltername"] = shelter["name"]
     pets_df = pd.concat([pets_df, pd.DataFrame([data])], ignore_index=True)
+    changes.append("pets", data["pet_id"])
+    save_data()
+
+# Import pets from a CSV in the pets.csv layout and an optional zip of their photos.
+# Every row is checked first; photos of the valid rows are uploaded in parallel, then all
+# valid rows are appended in one write. Returns one ImportResult per CSV row.
+def import_pets(csv_file, photos_file, shelter):
+    global pets_df, adopters_df, shelters_df, pet_index, shelter_partitions
+    try:
+        rows_df = pd.read_csv(csv_file, dtype=str, keep_default_na=False)
+        photos_zip = open_photo_zip(photos_file)
+    except Exception as e:
+        st.error(f"Error reading the import files: {e}")
+        return []
+    photos = zip_photos(photos_zip) if photos_zip is not None else None
+    try:
+        new_pets, results = validate_import(rows_df, shelter["shelter_id"], shelter["name"], pets_df["pet_id"], photos)
+    except ValueError as e:
+        st.error(str(e))
+        return []
+    if new_pets.empty:
+        return results
+    positions = {result.pet_id: i for i, result in enumerate(results) if result.pet_id}
+
+    # Photos are stored under the pet's id, so the CSV's file names are replaced once uploaded.
+    # Without a zip, image_path is kept as given.
+    members = {}
+    if photos is not None:
+        members = {pet_id: photos[os.path.basename(photo)][0] for pet_id, photo in zip(new_pets["pet_id"], new_pets["image_path"]) if photo}
+        new_pets["image_path"] = ""
+    if members and drive_service is None:
+        st.warning("Google Drive is unavailable, the pets are imported without their photos.")
+        for pet_id in members:
+            results[positions[pet_id]] = results[positions[pet_id]]._replace(message="photo not uploaded: Google Drive is unavailable")
+    elif members:
+        folder_id = st.secrets["gcp"]["drive_folder_id"]
+        uploader = PhotoUploader(
+            drive_service,
+            folder_id,
+            get_drive_image_index(drive_service, folder_id),
+            workers=st.secrets.get("bulk_import", {}).get("workers", DEFAULT_UPLOAD_WORKERS)
+        )
+        photo_rows = pd.Index(new_pets["pet_id"])
+        progress_bar = st.progress(0.0, text=f"Uploading {len(members)} photos...")
+        for done, (pet_id, file_name, error) in enumerate(uploader.upload_all(photos_zip, members), start=1):
+            if error is None:
+                new_pets.at[photo_rows.get_loc(pet_id), "image_path"] = file_name
+            else:
+                results[positions[pet_id]] = results[positions[pet_id]]._replace(message=f"photo not uploaded: {error}")
+            progress_bar.progress(done / len(members), text=f"Uploading photos... {done}/{len(members)}")
+        progress_bar.empty()
+
+    pets_df = pd.concat([pets_df, new_pets], ignore_index=True)
+    for pet_id in new_pets["pet_id"]:
+        changes.append("pets", pet_id)
     save_data()
+    # save_data() keeps the changes when the write failed; drop the unsaved rows
+    saved = not changes
+    if not saved:
+        changes.clear()
+        pets_df, adopters_df, shelters_df, pet_index, shelter_partitions = load_data()
+    for i in positions.values():
+        results[i] = results[i]._replace(status="imported" if saved else "failed", message=results[i].message if saved else "not saved")
+    return results
 
 # Edit pet
 def edit_pet(pet_id, data):
     global pets_df
-    pet_idx = pets_df.index[pets_df["pet_id"] == pet_id].tolist()[0]
-    pets_df.loc[pet_idx, data.keys()] = data.values()
+    pets_df = pets_df.copy()
+    pet_idx = pets_df.index[pet_index[pet_id]]
+    set_row_values(pets_df, pet_idx, data)
+    changes.update("pets", pet_id, data.keys())
     save_data()
 
 # Sidebar navigation
@@ -211,22 +257,76 @@ else:
                 "time_in_shelter": time_in_shelter, "disability_current": disability_current,
                 "disability_past": disability_past, "special_needs": special_needs
             }
-            add_pet(data, shelter["shelter_id"])
+            add_pet(data, shelter)
             if uploaded_file:
-                file_id = upload_photo(data["pet_id"], uploaded_file)
+                file_id, file_name = upload_photo(data["pet_id"], uploaded_file)
                 if file_id:
-                    pet_idx = pets_df.index[pets_df["pet_id"] == data["pet_id"]].tolist()[0]
-                    pets_df.at[pet_idx, "image_path"] = f"{data['pet_id']}.jpg"
+                    pets_df = pets_df.copy()
+                    pet_idx = pets_df.index[pet_index[data["pet_id"]]]
+                    pets_df.at[pet_idx, "image_path"] = file_name
+                    changes.update("pets", data["pet_id"], ["image_path"])
                     save_data()
             st.success("Pet added successfully!")
 
+    # Counts over this shelter's partition of the catalog
+    with st.expander("Shelter Statistics"):
+        st.metric("Pets in your shelter", len(shelter_partitions.get(shelter["shelter_id"])))
+        stats = shelter_partitions.stats(pets_df, shelter["shelter_id"])
+        stat_columns = st.columns(len(stats)) if stats else []
+        for stat_column, (column, counts) in zip(stat_columns, stats.items()):
+            with stat_column:
+                st.markdown(f"**By {column.replace('_', ' ')}**")
+                st.dataframe(counts.rename("Pets"))
+
+    # Bulk import from a CSV and a zip of photos
+    with st.expander("Bulk Import"):
+        st.caption("Upload a CSV with the columns of pets.csv and, optionally, a ZIP of the photos named in its image_path column. Without a ZIP, image_path is saved as given.")
+        import_csv = st.file_uploader("Pets CSV", type=["csv"])
+        import_photos = st.file_uploader("Photos (ZIP)", type=["zip"])
+        if st.button("Import Pets", disabled=import_csv is None):
+            results = import_pets(import_csv, import_photos, shelter)
+            if results:
+                imported = sum(result.status == "imported" for result in results)
+                if imported == len(results):
+                    st.success(f"Imported {imported} pets.")
+                else:
+                    st.warning(f"Imported {imported} of {len(results)} pets.")
+                st.dataframe(pd.DataFrame(results), hide_index=True)
+
     # Edit pet
     with st.expander("Edit Pet"):
-        pet_id = st.selectbox("Select Pet", pets_df[pets_df["sheltername"] == shelter["name"]]["pet_id"])
+        pet_id = st.selectbox("Select Pet", pets_df["pet_id"].iloc[shelter_partitions.get(shelter["shelter_id"])])
         if pet_id:
-            pet = pets_df[pets_df["pet_id"] == pet_id].iloc[0]
+            pet = pets_df.iloc[pet_index[pet_id]]
             breed = st.text_input("Breed", value=pet["breed"])
             age = st.number_input("Age", min_value=0.0, step=0.1, value=float(pet["age"]))
             if st.button("Save Changes"):
                 edit_pet(pet_id, {"breed": breed, "age": age})
-                st.success("Pet updated successfully!")
\ No newline at end of file
+                st.success("Pet updated successfully!")
+
+    # Rank adopters for one of the shelter's pets or for all of them
+    with st.expander("Find Adopters"):
+        shelter_pets = pets_df.iloc[shelter_partitions.get(shelter["shelter_id"])]
+        scope = st.radio("Rank adopters for", ["One pet", "All my pets"], horizontal=True)
+        top_n = st.number_input("Adopters per pet", min_value=1, max_value=100, value=DEFAULT_TOP_ADOPTERS, step=1)
+        if scope == "One pet":
+            match_pet_id = st.selectbox("Pet", shelter_pets["pet_id"], key="match_pet_id")
+            selected_pets = shelter_pets[shelter_pets["pet_id"] == match_pet_id]
+        else:
+            selected_pets = shelter_pets
+        if st.button("Find Adopters"):
+            # Adopters who already liked or skipped a pet are left out for it
+            ranked = rank_adopters(selected_pets, adopters_df, data_store.get().interactions, k=int(top_n))
+            adopter_rows = pd.Index(adopters_df["adopter_id"])
+            rows = []
+            for pet_id, pet_name in zip(selected_pets["pet_id"], selected_pets["name"]):
+                for adopter_id, score in ranked.get(pet_id, []):
+                    adopter = adopters_df.iloc[adopter_rows.get_loc(adopter_id)]
+                    rows.append({"Pet": pet_name, "Adopter": adopter["name"], "Country": adopter["country"], "Match": f"{score:.0%}"})
+            if rows:
+                st.dataframe(pd.DataFrame(rows), hide_index=True)
+            else:
+                st.info("No adopters to suggest yet.")
+
+# Log how long a fresh process took to render this page
+get_startup_timer().page_rendered("Shelter Dashboard", script_started)
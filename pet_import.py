@@ -0,0 +1,149 @@
+import io
+import logging
+import os
+import uuid
+import zipfile
+import pandas as pd
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from drive_uploads import detect_mime_type, extension_for, upload_resumable
+from image_pipeline import make_derivatives, upload_derivatives
+from schema import ALLOWED_VALUES
+
+logger = logging.getLogger(__name__)
+
+# Columns of pets.csv a shelter fills in; pet_id and the shelter columns are set on import
+IMPORT_COLUMNS = [
+    "species", "breed", "gender", "name", "activity_level", "age", "allergy_friendly",
+    "time_in_shelter", "disability_current", "disability_past", "special_needs", "image_path",
+]
+REQUIRED_FIELDS = ["species", "breed", "gender", "name", "activity_level", "age"]
+PHOTO_TYPES = {"image/jpeg", "image/png"}
+DEFAULT_UPLOAD_WORKERS = 4
+
+# Outcome of one CSV row; line is the row's line number in the file, counting the header as line 1
+ImportResult = namedtuple("ImportResult", ["line", "name", "pet_id", "status", "message"])
+
+
+# New pet id in the format add_pet uses, unique among existing_ids
+def new_pet_id(existing_ids):
+    while True:
+        pet_id = f"PET{uuid.uuid4().hex[:6].upper()}"
+        if pet_id not in existing_ids:
+            return pet_id
+
+
+# Photos in an uploaded zip by file name, ignoring folders and macOS metadata:
+# {file name: (member name, MIME type from the first bytes)}
+def zip_photos(photos_zip):
+    photos = {}
+    for info in photos_zip.infolist():
+        name = os.path.basename(info.filename)
+        if info.is_dir() or info.filename.startswith("__MACOSX/") or not name:
+            continue
+        with photos_zip.open(info) as member:
+            photos[name] = (info.filename, detect_mime_type(io.BytesIO(member.read(16))))
+    return photos
+
+
+def _row_errors(row, photos):
+    errors = [f"missing {field}" for field in REQUIRED_FIELDS if not row[field]]
+    for field in ("gender", "activity_level", "time_in_shelter"):
+        value = row[field]
+        if value and value not in ALLOWED_VALUES[field]:
+            errors.append(f"{field} must be one of {', '.join(sorted(ALLOWED_VALUES[field]))}")
+    if row["allergy_friendly"] not in ("", "Yes", "No"):
+        errors.append("allergy_friendly must be Yes or No")
+    age = row["age"]
+    if age:
+        try:
+            if float(age) < 0:
+                errors.append("age must not be negative")
+        except ValueError:
+            errors.append("age must be a number")
+    if photos is None:
+        # No zip: image_path is kept as given, e.g. a photo already in the Drive folder
+        return errors
+    photo = os.path.basename(row["image_path"])
+    if photo and photo not in photos:
+        errors.append(f"photo {photo} is not in the zip")
+    elif photo and photos[photo][1] not in PHOTO_TYPES:
+        errors.append(f"photo {photo} is not a JPEG or PNG")
+    return errors
+
+
+# Check every row of an import CSV (cell text, pets.csv columns) against zip_photos(), or None when no zip
+# was uploaded, in which case image_path is not checked. Returns the rows that passed,
+# with generated pet ids and the shelter's id and name filled in, and one ImportResult per row.
+# Rows that passed are marked "ready" until they are written.
+def validate_import(rows_df, shelter_id, sheltername, existing_ids, photos=None):
+    missing = [column for column in REQUIRED_FIELDS if column not in rows_df.columns]
+    if missing:
+        raise ValueError(f"The CSV is missing the columns: {', '.join(missing)}")
+    existing_ids = set(existing_ids)
+    valid, results = [], []
+    for line, row in enumerate(rows_df.to_dict("records"), start=2):
+        row = {column: "" if pd.isna(row.get(column)) else str(row[column]).strip() for column in IMPORT_COLUMNS}
+        errors = _row_errors(row, photos)
+        if errors:
+            results.append(ImportResult(line, row["name"], "", "failed", "; ".join(errors)))
+            continue
+        row["pet_id"] = new_pet_id(existing_ids)
+        existing_ids.add(row["pet_id"])
+        row["shelter_id"] = shelter_id
+        row["sheltername"] = sheltername
+        valid.append(row)
+        results.append(ImportResult(line, row["name"], row["pet_id"], "ready", ""))
+    return pd.DataFrame(valid, columns=["pet_id", "shelter_id", "sheltername"] + IMPORT_COLUMNS), results
+
+
+# Uploads photos to the Drive folder on a bounded pool of threads. The workers share one Drive
+# service, which sends each thread's requests on that thread's own connection. Each photo is uploaded
+# in resumable chunks and followed by its resized derivatives, like a single upload from the form.
+class PhotoUploader:
+    def __init__(self, drive_service, folder_id, image_index=None, workers=DEFAULT_UPLOAD_WORKERS):
+        self.drive_service = drive_service
+        self.folder_id = folder_id
+        self.image_index = image_index
+        self.workers = workers
+
+    # Upload one photo as <pet_id>.<ext>; returns the file name
+    def upload(self, pet_id, data):
+        drive_service = self.drive_service
+        file = io.BytesIO(data)
+        mime_type = detect_mime_type(file)
+        if mime_type not in PHOTO_TYPES:
+            raise ValueError(f"not a JPEG or PNG photo ({mime_type})")
+        file_name = f"{pet_id}{extension_for(mime_type)}"
+        file_id = upload_resumable(drive_service, file, file_name, self.folder_id, mime_type)
+        if self.image_index is not None:
+            self.image_index.add(file_name, file_id)
+        upload_derivatives(drive_service, self.folder_id, make_derivatives(data, file_name), self.image_index)
+        return file_name
+
+    # Upload {pet_id: member name} from the zip, yielding (pet_id, file name, error) as each finishes.
+    # Members are read on this thread just before their upload starts, so at most a few photos
+    # are held in memory at once.
+    def upload_all(self, photos_zip, members):
+        pending = list(members.items())
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="photo-upload") as pool:
+            in_flight = {}
+            while pending or in_flight:
+                while pending and len(in_flight) < self.workers * 2:
+                    pet_id, member = pending.pop(0)
+                    in_flight[pool.submit(self.upload, pet_id, photos_zip.read(member))] = pet_id
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pet_id = in_flight.pop(future)
+                    try:
+                        yield pet_id, future.result(), None
+                    except Exception as e:
+                        logger.error(f"Failed to upload the photo for {pet_id}: {e}")
+                        yield pet_id, None, str(e)
+
+
+# Open an uploaded zip of photos, or None when there is none
+def open_photo_zip(file):
+    if file is None:
+        return None
+    return zipfile.ZipFile(file)
@@ -0,0 +1,190 @@
+import streamlit as st
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: page renders and form submits before flushes and prefetching
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Requests per minute and burst size per API. Sheets allows 60 requests per minute per user,
+# which the service account is; Drive allows far more, so its bucket rarely throttles.
+DEFAULT_LIMITS = {
+    "sheets": {"per_minute": 60, "burst": 10},
+    "drive": {"per_minute": 1200, "burst": 50},
+}
+# Waits longer than this are logged
+LOG_THROTTLED_SECONDS = 1.0
+# How often the dispatcher logs stats() while calls are going through
+DEFAULT_STATS_LOG_SECONDS = 300
+
+_context = threading.local()
+
+
+# Priority for API calls made on this thread
+def current_priority():
+    return getattr(_context, "priority", INTERACTIVE)
+
+
+# Mark the API calls made inside the block as background work, e.g. in a worker thread
+@contextmanager
+def background_priority():
+    previous = current_priority()
+    _context.priority = BACKGROUND
+    try:
+        yield
+    finally:
+        _context.priority = previous
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst):
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    # Take a token if one is available; otherwise return the seconds until the next one
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+# Process-wide gate for Google API calls from every session and background thread.
+# Each API has a token bucket and a priority queue of waiting calls; a dispatcher thread
+# hands out tokens, highest priority first, in arrival order within a priority.
+class RateLimiter:
+    def __init__(self, limits=DEFAULT_LIMITS, stats_log_seconds=DEFAULT_STATS_LOG_SECONDS):
+        self.stats_log_seconds = stats_log_seconds
+        self._stats_logged_at = time.monotonic()
+        self._calls_since_log = 0
+        self.buckets = {name: TokenBucket(limit["per_minute"], limit["burst"]) for name, limit in limits.items()}
+        self._queues = {name: [] for name in limits}
+        self._order = itertools.count()
+        self._metrics = {name: {"calls": 0, "throttled_calls": 0, "throttled_seconds": 0.0, "max_queue_depth": 0} for name in limits}
+        self._wakeup = threading.Condition()
+        self._thread = threading.Thread(target=self._dispatch, name="rate-limiter", daemon=True)
+        self._thread.start()
+
+    # Future that resolves once a call to the API may go out; callers can wait on it or add callbacks
+    def acquire(self, bucket, priority=None):
+        grant = Future()
+        priority = current_priority() if priority is None else priority
+        with self._wakeup:
+            queue = self._queues[bucket]
+            heapq.heappush(queue, (priority, next(self._order), time.monotonic(), grant))
+            metrics = self._metrics[bucket]
+            metrics["max_queue_depth"] = max(metrics["max_queue_depth"], len(queue))
+            self._wakeup.notify()
+        return grant
+
+    # Run fn once the API allows it, on the calling thread; the Google clients are not thread-safe
+    def call(self, bucket, fn, *args, **kwargs):
+        self.acquire(bucket).result()
+        return fn(*args, **kwargs)
+
+    def _dispatch(self):
+        while True:
+            with self._wakeup:
+                wait = None
+                for name, queue in self._queues.items():
+                    while queue:
+                        delay = self.buckets[name].take()
+                        if delay:
+                            wait = delay if wait is None else min(wait, delay)
+                            break
+                        _, _, queued_at, grant = heapq.heappop(queue)
+                        self._record(name, time.monotonic() - queued_at, len(queue))
+                        grant.set_result(True)
+                self._log_stats_if_due()
+                if wait is None and not any(self._queues.values()):
+                    self._wakeup.wait()
+                else:
+                    self._wakeup.wait(wait)
+
+    def _record(self, bucket, waited, depth):
+        metrics = self._metrics[bucket]
+        metrics["calls"] += 1
+        self._calls_since_log += 1
+        if waited >= 0.001:
+            metrics["throttled_calls"] += 1
+            metrics["throttled_seconds"] += waited
+        if waited >= LOG_THROTTLED_SECONDS:
+            logger.info(f"Throttled a {bucket} call for {waited:.1f}s ({depth} still queued)")
+
+    # Log stats() once the interval has passed, if any calls went through since the last time;
+    # call with the lock held
+    def _log_stats_if_due(self):
+        if not self._calls_since_log or time.monotonic() - self._stats_logged_at < self.stats_log_seconds:
+            return
+        self._stats_logged_at = time.monotonic()
+        self._calls_since_log = 0
+        summary = "; ".join(
+            f"{name}: {stats['calls']} calls, {stats['throttled_calls']} throttled for {stats['throttled_seconds']:.1f}s, "
+            f"queue {stats['queue_depth']} (max {stats['max_queue_depth']})"
+            for name, stats in self.stats().items()
+        )
+        logger.info(f"Rate limiter stats: {summary}")
+
+    # Queue depth, calls and time spent throttled per API
+    def stats(self):
+        with self._wakeup:
+            return {
+                name: {**metrics, "queue_depth": len(self._queues[name])}
+                for name, metrics in self._metrics.items()
+            }
+
+
+# Route every request of a gspread client through the limiter's "sheets" bucket
+def rate_limited_gspread(gc, limiter):
+    # gspread 6 sends requests through Client.http_client, older versions through the client itself
+    http_client = getattr(gc, "http_client", gc)
+    request = http_client.request
+    if getattr(request, "rate_limited", False):
+        return gc
+
+    def limited_request(*args, **kwargs):
+        return limiter.call("sheets", request, *args, **kwargs)
+
+    limited_request.rate_limited = True
+    http_client.request = limited_request
+    return gc
+
+
+# httplib2-style wrapper for googleapiclient: build("drive", "v3", http=RateLimitedHttp(...))
+class RateLimitedHttp:
+    def __init__(self, http, limiter, bucket="drive"):
+        self.http = http
+        self.limiter = limiter
+        self.bucket = bucket
+
+    def request(self, *args, **kwargs):
+        return self.limiter.call(self.bucket, self.http.request, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+# Return the process-wide rate limiter, configured from the [rate_limits] secrets section
+@st.cache_resource
+def get_rate_limiter():
+    config = st.secrets.get("rate_limits", {})
+    limits = {
+        name: {
+            "per_minute": config.get(f"{name}_per_minute", limit["per_minute"]),
+            "burst": config.get(f"{name}_burst", limit["burst"]),
+        }
+        for name, limit in DEFAULT_LIMITS.items()
+    }
+    return RateLimiter(limits, config.get("stats_log_seconds", DEFAULT_STATS_LOG_SECONDS))
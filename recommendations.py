@@ -0,0 +1,203 @@
+import streamlit as st
+import pandas as pd
+import bisect
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from itertools import islice
+from indexes import PetAttributeIndex, SCORED_ATTRIBUTES, signature_pet
+from matching import calculate_match
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ADOPTERS = 1000
+DEFAULT_PAGE_SIZE = 5
+
+# Rankings grow in chunks of at least this many pets as adopters page past them
+EXTEND_CHUNK_SIZE = 50
+
+# Pet columns the attribute index files pets under; edits to other columns leave it and every ranking as they are
+INDEXED_PET_COLUMNS = set(SCORED_ATTRIBUTES) | {"special_needs", "sheltername"}
+
+
+# The next count pets an adopter would rank after the given (-score, seq) key, best first.
+# Pets sharing a signature share a score, so only one calculate_match runs per signature;
+# whole signature groups ranked above the key are skipped and lower ones are never touched.
+def ranked_pets(index, adopter, after=None, count=DEFAULT_PAGE_SIZE):
+    tiers = {}
+    for signature in index.by_signature:
+        tiers.setdefault(calculate_match(adopter, signature_pet(signature)), []).append(signature)
+    ranked = []
+    for score in sorted(tiers, reverse=True):
+        if after is not None and -score < after[0]:
+            continue
+        start = after[1] if after is not None and -score == after[0] else -1
+        postings = [index.by_signature[signature] for signature in tiers[score]]
+        # Equal scores tie-break in catalog order, as top_k() does
+        seqs = heapq.merge(*(islice(seqs, bisect.bisect_right(seqs, start), None) for seqs in postings))
+        for seq in islice(seqs, count - len(ranked)):
+            ranked.append(((-score, seq), index.pet_ids[seq]))
+        if len(ranked) >= count:
+            break
+    return ranked
+
+
+# One adopter's ranking, best match first, ordered by (-score, seq) keys from the attribute index.
+# Only the prefix the adopter has paged into is materialized; it grows on demand.
+class Ranking:
+    def __init__(self, adopter):
+        self.adopter = adopter
+        self.pet_ids = []
+        self.keys = []
+        self.key_of = {}
+        # True once the prefix holds every pet in the catalog
+        self.complete = False
+        # Every rank before the cursor is a pet the adopter already liked or skipped
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.pet_ids)
+
+    def _extend(self, index, count):
+        ranked = ranked_pets(index, self.adopter, self.keys[-1] if self.keys else None, count)
+        for key, pet_id in ranked:
+            self.keys.append(key)
+            self.pet_ids.append(pet_id)
+            self.key_of[pet_id] = key
+        if len(ranked) < count:
+            self.complete = True
+
+    def remove(self, pet_id):
+        key = self.key_of.pop(pet_id, None)
+        if key is None:
+            return
+        rank = bisect.bisect_left(self.keys, key)
+        del self.keys[rank]
+        del self.pet_ids[rank]
+        if rank < self.cursor:
+            self.cursor -= 1
+
+    # Insert a new pet or move an edited one to where its score now ranks it
+    def place(self, pet_id, key):
+        self.remove(pet_id)
+        if not self.complete and (not self.keys or key > self.keys[-1]):
+            # Past the materialized prefix; extending will reach it from the index
+            return
+        rank = bisect.bisect_right(self.keys, key)
+        self.keys.insert(rank, key)
+        self.pet_ids.insert(rank, pet_id)
+        self.key_of[pet_id] = key
+        # A pet ranked ahead of the cursor must not be hidden behind it
+        self.cursor = min(self.cursor, rank)
+
+    # Next limit pet ids the adopter has not liked or skipped, moving the cursor past seen ones
+    def page(self, index, excluded, limit=DEFAULT_PAGE_SIZE):
+        page = []
+        rank = self.cursor
+        while len(page) < limit:
+            if rank == len(self.pet_ids):
+                if self.complete:
+                    break
+                self._extend(index, max(limit, EXTEND_CHUNK_SIZE))
+                continue
+            pet_id = self.pet_ids[rank]
+            if pet_id not in excluded:
+                page.append(pet_id)
+            elif rank == self.cursor and not page:
+                self.cursor += 1
+            rank += 1
+        return page
+
+
+# Process-wide rankings for recently active adopters over a shared attribute index of the catalog.
+# Both are kept current from the data store's applied changes: an added or edited pet is
+# re-filed in the index and scored once per cached adopter, instead of re-scoring the catalog.
+# A reload that brings in changes made outside the app rebuilds the index and drops every ranking;
+# the data store keeps the version of a reload that found nothing new, so the rankings survive it.
+class RecommendationStore:
+    def __init__(self, max_adopters=DEFAULT_MAX_ADOPTERS):
+        self.max_adopters = max_adopters
+        self.version = None
+        self.index = PetAttributeIndex()
+        self._rankings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync(self, snapshot):
+        if self.version is None or snapshot.version > self.version:
+            self.index = PetAttributeIndex.build(snapshot.pets)
+            self._rankings.clear()
+            self.version = snapshot.version
+
+    def _ranking(self, snapshot, adopter_id):
+        ranking = self._rankings.get(adopter_id)
+        if ranking is not None:
+            self._rankings.move_to_end(adopter_id)
+            return ranking
+        adopters_df = snapshot.adopters
+        matches = adopters_df[adopters_df["adopter_id"] == adopter_id]
+        if matches.empty:
+            return None
+        ranking = Ranking(matches.iloc[0])
+        self._rankings[adopter_id] = ranking
+        if len(self._rankings) > self.max_adopters:
+            self._rankings.popitem(last=False)
+        return ranking
+
+    # Next limit recommended pet ids for an adopter, best first, skipping liked and skipped pets
+    def page(self, snapshot, adopter_id, limit=DEFAULT_PAGE_SIZE):
+        with self._lock:
+            self._sync(snapshot)
+            ranking = self._ranking(snapshot, adopter_id)
+            if ranking is None:
+                return []
+            return ranking.page(self.index, snapshot.interaction_index.excluded(adopter_id), limit)
+
+    # Data store change hook: patch the index and the cached rankings with the pets that changed
+    def apply_changes(self, changes, snapshot):
+        with self._lock:
+            if self.version is None:
+                return
+            if snapshot.version != self.version + 1:
+                # We missed a reload in between; rebuild on next use
+                self.version = None
+                return
+            self.version = snapshot.version
+            for adopter_id in changes.deleted["adopters"] | set(changes.updated["adopters"]):
+                self._rankings.pop(adopter_id, None)
+
+            changed = list(changes.appended["pets"]) + [
+                pet_id for pet_id, columns in changes.updated["pets"].items() if columns & INDEXED_PET_COLUMNS
+            ]
+            deleted = changes.deleted["pets"]
+            if not (changed or deleted):
+                return
+            pets = [snapshot.pets.iloc[snapshot.pet_index[pet_id]] for pet_id in changed if pet_id in snapshot.pet_index]
+            for pet_id in deleted:
+                self.index.remove(pet_id)
+            for pet in pets:
+                self.index.put(pet)
+
+            adopter_ids = list(self._rankings)
+            positions = pd.Index(snapshot.adopters["adopter_id"]).get_indexer(adopter_ids)
+            for adopter_id, pos in zip(adopter_ids, positions):
+                if pos < 0:
+                    del self._rankings[adopter_id]
+                    continue
+                adopter = snapshot.adopters.iloc[pos]
+                ranking = self._rankings[adopter_id]
+                for pet_id in deleted:
+                    ranking.remove(pet_id)
+                for pet in pets:
+                    ranking.place(pet["pet_id"], (-calculate_match(adopter, pet), self.index.seq(pet["pet_id"])))
+        logger.info(f"Re-ranked {len(changed)} changed and {len(deleted)} deleted pets for {len(adopter_ids)} adopters")
+
+
+# Return the process-wide recommendation store, kept current by the data store's change hook.
+# Configured from the [recommendations] secrets section.
+@st.cache_resource
+def get_recommendation_store(_data_store):
+    config = st.secrets.get("recommendations", {})
+    store = RecommendationStore(config.get("max_adopters", DEFAULT_MAX_ADOPTERS))
+    _data_store.add_change_hook(store.apply_changes)
+    return store
@@ -0,0 +1,111 @@
+import pandas as pd
+import logging
+from matching import ACTIVITY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+CATEGORY = "category"
+NUMBER = "number"
+YES_NO = "yes_no"
+
+YES_NO_VALUES = {"Yes": True, "No": False, True: True, False: False}
+
+# Column types per table, applied once when a table is loaded. Columns not listed stay text.
+SCHEMAS = {
+    "pets": {
+        "species": CATEGORY, "breed": CATEGORY, "gender": CATEGORY, "activity_level": CATEGORY,
+        "allergy_friendly": YES_NO, "time_in_shelter": CATEGORY, "sheltername": CATEGORY, "age": NUMBER,
+    },
+    "adopters": {
+        "country": CATEGORY, "pref_species": CATEGORY, "pref_gender": CATEGORY, "activity_level": CATEGORY,
+        "house": YES_NO, "garden": YES_NO, "allergy_friendly": YES_NO, "age": NUMBER, "apartment_size": NUMBER,
+    },
+    "shelters": {},
+    "interactions": {"action": CATEGORY},
+}
+
+# Values the forms offer; anything else is logged when a table is typed
+ALLOWED_VALUES = {
+    "gender": {"Male", "Female"},
+    "pref_gender": {"Male", "Female", "Any"},
+    "activity_level": set(ACTIVITY_LEVELS),
+    "time_in_shelter": {"< 1 year", "1-2 years", "2+ years"},
+    "action": {"like", "skip"},
+}
+
+
+def _is_blank(column):
+    return column.isna() | (column.astype(str).str.strip() == "")
+
+
+def _to_category(table, name, column):
+    column = column.where(~_is_blank(column))
+    allowed = ALLOWED_VALUES.get(name)
+    if allowed is not None:
+        unknown = column.notna() & ~column.isin(allowed)
+        if unknown.any():
+            logger.warning(f"{table}.{name}: {int(unknown.sum())} values outside {sorted(allowed)}: {sorted(column[unknown].astype(str).unique())[:5]}")
+    return column.astype(CATEGORY)
+
+
+def _to_number(table, name, column):
+    blank = _is_blank(column)
+    numbers = pd.to_numeric(column.where(~blank), errors="coerce")
+    invalid = numbers.isna() & ~blank
+    if invalid.any():
+        logger.warning(f"{table}.{name}: {int(invalid.sum())} values are not numbers: {sorted(column[invalid].astype(str).unique())[:5]}")
+    # Whole numbers stay integers, so they read and write back as "3" rather than "3.0"
+    if ((numbers % 1 == 0) | numbers.isna()).all():
+        return numbers.astype("Int64")
+    return numbers.astype("Float64")
+
+
+def _to_yes_no(table, name, column):
+    blank = _is_blank(column)
+    values = column.map(lambda value: YES_NO_VALUES.get(value) if isinstance(value, (str, bool)) else None)
+    invalid = values.isna() & ~blank
+    if invalid.any():
+        logger.warning(f"{table}.{name}: {int(invalid.sum())} values are not Yes/No: {sorted(column[invalid].astype(str).unique())[:5]}")
+    return values.astype("boolean")
+
+
+CONVERTERS = {CATEGORY: _to_category, NUMBER: _to_number, YES_NO: _to_yes_no}
+
+
+def _has_type(column, kind):
+    if kind == CATEGORY:
+        return isinstance(column.dtype, pd.CategoricalDtype)
+    if kind == NUMBER:
+        return str(column.dtype) in ("Int64", "Float64")
+    return str(column.dtype) == "boolean"
+
+
+# Convert a table of cell text to its typed columns, validating values on the way.
+# Columns that already have their type are left alone, so re-applying is cheap.
+def apply_schema(table, df):
+    converted = {
+        name: CONVERTERS[kind](table, name, df[name])
+        for name, kind in SCHEMAS.get(table, {}).items()
+        if name in df.columns and not _has_type(df[name], kind)
+    }
+    if not converted:
+        return df
+    df = df.copy()
+    for name, column in converted.items():
+        df[name] = column
+    return df
+
+
+# Set values on one row of a typed frame, as entered in a form. Categories are added
+# for new values, Yes/No becomes a boolean and integer columns widen for fractions.
+def set_row_values(df, label, values):
+    for name, value in values.items():
+        if name in df.columns:
+            column = df[name]
+            if isinstance(column.dtype, pd.CategoricalDtype) and pd.notna(value) and value not in column.cat.categories:
+                df[name] = column.cat.add_categories([value])
+            elif str(column.dtype) == "boolean":
+                value = YES_NO_VALUES.get(value, value)
+            elif str(column.dtype) == "Int64" and isinstance(value, float) and not value.is_integer():
+                df[name] = column.astype("Float64")
+        df.at[label, name] = value
@@ -0,0 +1,30 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Drive bumps a file's version on every edit; modifiedTime is kept as a second signal
+REVISION_FIELDS = "version, modifiedTime"
+
+
+# Current revision of each spreadsheet, read from Drive file metadata in one batched request.
+# sheet_ids maps table names to spreadsheet ids. Sheets whose metadata can't be read map to
+# None, which callers treat as changed.
+def fetch_revisions(drive_service, sheet_ids):
+    revisions = dict.fromkeys(sheet_ids)
+    if drive_service is None or not sheet_ids:
+        return revisions
+
+    def record(table, response, exception):
+        if exception is not None:
+            logger.warning(f"Failed to read the revision of the {table} sheet: {exception}")
+            return
+        revisions[table] = (response.get("version"), response.get("modifiedTime"))
+
+    batch = drive_service.new_batch_http_request(callback=record)
+    for table, sheet_id in sheet_ids.items():
+        batch.add(drive_service.files().get(fileId=sheet_id, fields=REVISION_FIELDS, supportsAllDrives=True), request_id=table)
+    try:
+        batch.execute()
+    except Exception as e:
+        logger.warning(f"Failed to read sheet revisions from Drive: {e}")
+    return revisions
@@ -0,0 +1,147 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Primary key column of each table
+TABLE_KEYS = {"pets": "pet_id", "adopters": "adopter_id", "shelters": "shelter_id", "interactions": "interaction_id"}
+
+
+# Value as it should be written to a sheet cell; missing values become empty cells
+def cell_value(value):
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return ""
+    if hasattr(value, "item"):
+        # Unwrap NumPy scalars so they serialize as plain JSON numbers
+        value = value.item()
+    if isinstance(value, bool):
+        # Typed Yes/No columns go back to the sheet as the text the forms use
+        return "Yes" if value else "No"
+    return value
+
+
+# Value as text, the way get_all_values() returns cells; cached frames hold only text
+def cell_text(value):
+    value = cell_value(value)
+    return value if isinstance(value, str) else str(value)
+
+
+# Record of the rows and cells a page has changed since its last save, per table
+class ChangeSet:
+    def __init__(self):
+        self.updated = defaultdict(dict)
+        self.appended = defaultdict(list)
+        self.deleted = defaultdict(set)
+
+    # Mark the given columns of an existing row as dirty
+    def update(self, table, key, columns):
+        if key in self.appended[table]:
+            # Appended rows are written in full, nothing to track per column
+            return
+        self.updated[table].setdefault(key, set()).update(columns)
+
+    # Mark a new row that should be appended to the end of the sheet
+    def append(self, table, key):
+        if key not in self.appended[table]:
+            self.appended[table].append(key)
+
+    # Mark an existing row for deletion
+    def delete(self, table, key):
+        if key in self.appended[table]:
+            self.appended[table].remove(key)
+            return
+        self.updated[table].pop(key, None)
+        self.deleted[table].add(key)
+
+    def tables(self):
+        return [table for table in TABLE_KEYS if self.updated[table] or self.appended[table] or self.deleted[table]]
+
+    def __bool__(self):
+        return bool(self.tables())
+
+    def clear(self):
+        self.updated.clear()
+        self.appended.clear()
+        self.deleted.clear()
+
+
+# Split sorted column numbers into runs of adjacent columns
+def _column_runs(col_numbers):
+    runs = []
+    for col in sorted(col_numbers):
+        if runs and col == runs[-1][-1] + 1:
+            runs[-1].append(col)
+        else:
+            runs.append([col])
+    return runs
+
+
+# Build the batch_update payload for dirty cells of one table.
+# sheet_df mirrors the sheet's current row order and header; frame holds the new values.
+def build_cell_updates(table, changes, sheet_df, frame):
+    from gspread.utils import rowcol_to_a1
+    key_column = TABLE_KEYS[table]
+    header = list(sheet_df.columns)
+    keys = list(changes.updated[table])
+    sheet_rows = pd.Index(sheet_df[key_column]).get_indexer(keys)
+    frame_rows = pd.Index(frame[key_column]).get_indexer(keys)
+    data = []
+    for key, sheet_pos, frame_pos in zip(keys, sheet_rows, frame_rows):
+        if sheet_pos < 0 or frame_pos < 0:
+            logger.warning(f"Skipping update for {table} row {key}: row not found")
+            continue
+        columns = [col for col in changes.updated[table][key] if col in header]
+        col_numbers = [header.index(col) + 1 for col in columns]
+        # Sheet rows are 1-based and row 1 is the header
+        row_number = sheet_pos + 2
+        for run in _column_runs(col_numbers):
+            values = [cell_value(frame.iat[frame_pos, frame.columns.get_loc(header[col - 1])]) for col in run]
+            cell_range = rowcol_to_a1(row_number, run[0])
+            if len(run) > 1:
+                cell_range += f":{rowcol_to_a1(row_number, run[-1])}"
+            data.append({"range": cell_range, "values": [values]})
+    return data
+
+
+# Rows to append for one table, laid out in the sheet's column order
+def build_appended_rows(table, changes, sheet_df, frame):
+    key_column = TABLE_KEYS[table]
+    header = list(sheet_df.columns)
+    rows = frame[frame[key_column].isin(changes.appended[table])]
+    return [[cell_value(row.get(col)) for col in header] for _, row in rows.iterrows()]
+
+
+# Write only the changed cells, appended rows and deleted rows of each dirty table.
+# sheet_snapshot is the data store snapshot that reflects the sheets' current layout.
+def flush_changes(gc, changes, frames, sheet_snapshot):
+    for table in changes.tables():
+        spreadsheet = gc.open_by_key(st.secrets["gcp"][f"sheets_{table}_id"])
+        worksheet = spreadsheet.sheet1
+        sheet_df = getattr(sheet_snapshot, table)
+        frame = frames[table]
+
+        cell_updates = build_cell_updates(table, changes, sheet_df, frame)
+        if cell_updates:
+            worksheet.batch_update(cell_updates)
+            logger.info(f"Updated {len(cell_updates)} ranges in {table} sheet")
+
+        if changes.deleted[table]:
+            key_column = TABLE_KEYS[table]
+            # Every row with a deleted key goes, so rows duplicated by an earlier retried append are removed too
+            positions = np.flatnonzero(sheet_df[key_column].isin(changes.deleted[table]).to_numpy())
+            # Delete from the bottom up so earlier row numbers stay valid
+            requests = [
+                {"deleteDimension": {"range": {"sheetId": worksheet.id, "dimension": "ROWS", "startIndex": int(pos) + 1, "endIndex": int(pos) + 2}}}
+                for pos in sorted(positions, reverse=True)
+            ]
+            if requests:
+                spreadsheet.batch_update({"requests": requests})
+                logger.info(f"Deleted {len(requests)} rows from {table} sheet")
+
+        appended_rows = build_appended_rows(table, changes, sheet_df, frame)
+        if appended_rows:
+            worksheet.append_rows(appended_rows)
+            logger.info(f"Appended {len(appended_rows)} rows to {table} sheet")
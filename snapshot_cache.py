@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import threading
+import time
+import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = ".snapshots"
+MANIFEST_NAME = "manifest.json"
+
+
+# Local copy of a set of tables as uncompressed Arrow IPC files, one per table, so a new
+# process can render before the remote source answers and keep serving reads when it doesn't.
+# Every write is a new generation of files; the manifest is swapped in last, so readers
+# never see a mix of two syncs.
+class SnapshotCache:
+    def __init__(self, directory):
+        self.directory = directory
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self):
+        with open(self._path(MANIFEST_NAME), encoding="utf-8") as manifest:
+            return json.load(manifest)
+
+    # Save a dict of frames by table name, replacing the previous snapshot
+    def write(self, tables):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            generation = time.time_ns()
+            files = {}
+            for table, df in tables.items():
+                files[table] = f"{table}.{generation}.arrow"
+                arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.OSFile(self._path(files[table]), "wb") as sink:
+                    with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                        writer.write_table(arrow_table)
+            temp_path = self._path(f"{MANIFEST_NAME}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as manifest:
+                json.dump({"files": files, "written_at": time.time()}, manifest)
+            os.replace(temp_path, self._path(MANIFEST_NAME))
+            # Drop earlier generations; readers holding a memory map keep their file until they close it
+            for name in os.listdir(self.directory):
+                if name.endswith(".arrow") and name not in files.values():
+                    os.remove(self._path(name))
+        logger.info(f"Saved a local snapshot of {len(tables)} tables to {self.directory}")
+
+    # The saved frames by table name, memory-mapped from disk, or None if there is no usable snapshot
+    def read(self):
+        try:
+            manifest = self._read_manifest()
+            tables = {}
+            for table, name in manifest["files"].items():
+                with pa.memory_map(self._path(name)) as source:
+                    tables[table] = pa.ipc.open_file(source).read_all().to_pandas()
+            return tables
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read the local snapshot in {self.directory}: {e}")
+            return None
+
+    # Seconds since the snapshot was written, or None if there is none
+    def age(self):
+        try:
+            return time.time() - self._read_manifest()["written_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # Run fetch() -> tables on a background thread and save the result; at most one runs at a time
+    def refresh(self, fetch):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.write(fetch())
+            except Exception as e:
+                logger.warning(f"Failed to refresh the local snapshot in {self.directory}: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="snapshot-refresh", daemon=True).start()
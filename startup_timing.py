@@ -0,0 +1,47 @@
+import streamlit as st
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Process-wide record of how long a fresh process takes to render each page the first time,
+# and how long each piece of Google client setup took and whether it ran before that first paint.
+# Setup that runs after the first paint (e.g. in a background load) no longer delays it;
+# before it was built lazily, all of it ran on every page's render path.
+class StartupTimer:
+    def __init__(self):
+        self.steps = []
+        self.first_paint = {}
+        self._lock = threading.Lock()
+
+    # Record one setup step that took seconds
+    def record(self, step, seconds):
+        with self._lock:
+            self.steps.append((step, seconds, not self.first_paint))
+        logger.info(f"Startup: {step} took {seconds * 1000:.0f} ms")
+
+    # Called at the end of a page's script with the time its run started; only the first run counts
+    def page_rendered(self, page, started_at):
+        with self._lock:
+            if page in self.first_paint:
+                return
+            self.first_paint[page] = time.perf_counter() - started_at
+        logger.info(self.report())
+
+    def report(self):
+        paints = ", ".join(f"{page} {seconds * 1000:.0f} ms" for page, seconds in self.first_paint.items())
+        before = sum(seconds for _, seconds, on_path in self.steps if on_path)
+        after = sum(seconds for _, seconds, on_path in self.steps if not on_path)
+        steps = ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds, _ in self.steps)
+        return (
+            f"Startup report: first paint {paints or 'pending'}; Google client setup {before * 1000:.0f} ms "
+            f"before the first paint and {after * 1000:.0f} ms after it ({steps or 'not built yet'})"
+        )
+
+
+# Return the process-wide startup timer
+@st.cache_resource
+def get_startup_timer():
+    return StartupTimer()
@@ -0,0 +1,240 @@
+import streamlit as st
+import pandas as pd
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from data_store import REQUIRED_TABLES, TABLES, fetch_tables, sheet_ids
+from indexes import pet_shelter_ids
+from interactions import INTERACTION_COLUMNS, migrate_legacy_interactions
+from sheet_revisions import fetch_revisions
+from sheet_writes import TABLE_KEYS, cell_text, flush_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = "shelter.db"
+BUNDLED_DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Secondary indexes for the lookups the pages run; primary keys are indexed by SQLite itself
+SQLITE_INDEXES = {
+    "pets": ["species", "sheltername", "shelter_id"],
+    "adopters": ["username"],
+    "shelters": ["username"],
+    "interactions": ["adopter_id"],
+}
+# Columns added after the bundled CSVs were laid out; storage that lacks them gets them on load
+ADDED_COLUMNS = {"pets": ["shelter_id"]}
+# Appends to these tables are keyed by content, so writing a row twice keeps one copy
+IDEMPOTENT_TABLES = {"interactions"}
+
+
+# Interface every storage engine implements. Tables travel as a dict of DataFrames of cell text
+# keyed by table name, with a stable row order, and writes arrive as a ChangeSet plus the frames holding the new values.
+class StorageBackend:
+    name = "base"
+    # Remote engines get a local snapshot for warm starts and offline reads
+    remote = False
+
+    def load_tables(self):
+        raise NotImplementedError
+
+    # snapshot is the data store snapshot the changes were made against
+    def write_changes(self, changes, frames, snapshot):
+        raise NotImplementedError
+
+
+# The original Google Sheets engine. Each load first reads every spreadsheet's revision from
+# Drive and refetches only the sheets that changed since they were last read; the frames of
+# the others are reused. Without a Drive client every load fetches every sheet.
+class SheetsBackend(StorageBackend):
+    name = "sheets"
+    remote = True
+
+    def __init__(self, gc, drive_service=None):
+        self.gc = gc
+        self.drive_service = drive_service
+        # Last fetched frame of each table and the revision it was read at
+        self._tables = {}
+        self._revisions = {}
+
+    def load_tables(self):
+        # Revisions are read before the sheets, so an edit made during the fetch is picked up next time
+        revisions = fetch_revisions(self.drive_service, sheet_ids())
+        stale = [
+            table for table in TABLES
+            if table not in self._tables or revisions[table] is None or revisions[table] != self._revisions.get(table)
+        ]
+        fetched = fetch_tables(self.gc, stale) if stale else {}
+        # A failed fetch comes back as empty tables; keep the cache for the next attempt
+        if any(fetched[table].empty for table in REQUIRED_TABLES if table in fetched):
+            return fetched
+        tables = {**self._tables, **fetched}
+        if "interactions" in fetched and tables["interactions"].empty and not tables["adopters"].empty:
+            tables["interactions"] = self._migrate_interactions(tables["adopters"])
+        if "pets" in fetched and "shelter_id" not in tables["pets"].columns:
+            tables["pets"] = self._migrate_pet_shelters(tables["pets"], tables["shelters"])
+        self._tables = tables
+        self._revisions.update({table: revisions[table] for table in stale})
+        logger.info(f"Fetched {len(stale)} changed sheets {stale}, reused {len(TABLES) - len(stale)} unchanged ones")
+        return dict(tables)
+
+    # Fill an empty interactions sheet from the adopters' legacy liked_pets/skipped_pets columns
+    def _migrate_interactions(self, adopters_df):
+        migrated = migrate_legacy_interactions(adopters_df)
+        if migrated.empty:
+            return migrated
+        worksheet = self.gc.open_by_key(st.secrets["gcp"]["sheets_interactions_id"]).sheet1
+        rows = migrated.values.tolist()
+        if not worksheet.row_values(1):
+            rows.insert(0, INTERACTION_COLUMNS)
+        worksheet.append_rows(rows)
+        logger.info(f"Migrated {len(migrated)} legacy interactions into the interactions sheet")
+        return migrated
+
+    # Add a shelter_id column to the pets sheet, filled from each pet's shelter name.
+    # If the sheet can't be changed, the pets keep resolving their shelter by name.
+    def _migrate_pet_shelters(self, pets_df, shelters_df):
+        from gspread.utils import rowcol_to_a1
+        shelter_ids = [shelter_id or "" for shelter_id in pet_shelter_ids(pets_df, shelters_df)]
+        column = len(pets_df.columns) + 1
+        try:
+            worksheet = self.gc.open_by_key(st.secrets["gcp"]["sheets_pets_id"]).sheet1
+            if worksheet.col_count < column:
+                worksheet.add_cols(column - worksheet.col_count)
+            values = [["shelter_id"]] + [[shelter_id] for shelter_id in shelter_ids]
+            worksheet.batch_update([{"range": f"{rowcol_to_a1(1, column)}:{rowcol_to_a1(len(values), column)}", "values": values}])
+        except Exception as e:
+            logger.error(f"Failed to add the shelter_id column to the pets sheet: {e}")
+            return pets_df
+        logger.info(f"Added the shelter_id column to the pets sheet for {len(pets_df)} pets")
+        return pets_df.assign(shelter_id=shelter_ids)
+
+    def write_changes(self, changes, frames, snapshot):
+        flush_changes(self.gc, changes, frames, snapshot)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+# Local SQLite engine, seeded from the bundled CSVs on first use.
+# Every write is a single transaction, and lookups by id, username, shelter and species are indexed.
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, seed_dir=BUNDLED_DATA_DIR):
+        self.path = path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            with conn:
+                for table in TABLES:
+                    self._ensure_table(conn, table, seed_dir)
+                self._fill_pet_shelters(conn)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _columns(self, conn, table):
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(table)})")]
+
+    # Rows to create a table with: the bundled CSV, or for interactions the adopters' legacy columns
+    def _seed(self, conn, table, seed_dir):
+        if table == "interactions":
+            adopters = pd.read_sql_query(f"SELECT * FROM {_quote('adopters')}", conn).fillna("")
+            return migrate_legacy_interactions(adopters)
+        return pd.read_csv(os.path.join(seed_dir, f"{table}.csv"), dtype=str, keep_default_na=False)
+
+    # Create a table from its seed rows and add the indexes
+    def _ensure_table(self, conn, table, seed_dir):
+        if not self._columns(conn, table):
+            seed = self._seed(conn, table, seed_dir)
+            key_column = TABLE_KEYS[table]
+            column_defs = ", ".join(
+                f"{_quote(col)} TEXT PRIMARY KEY" if col == key_column else f"{_quote(col)} TEXT NOT NULL DEFAULT ''"
+                for col in seed.columns
+            )
+            conn.execute(f"CREATE TABLE {_quote(table)} ({column_defs})")
+            placeholders = ", ".join("?" for _ in seed.columns)
+            conn.executemany(
+                f"INSERT INTO {_quote(table)} ({', '.join(_quote(col) for col in seed.columns)}) VALUES ({placeholders})",
+                seed.itertuples(index=False, name=None)
+            )
+            logger.info(f"Seeded SQLite table {table} with {len(seed)} rows")
+        columns = self._columns(conn, table)
+        for column in ADDED_COLUMNS.get(table, []):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} TEXT NOT NULL DEFAULT ''")
+                logger.info(f"Added column {column} to SQLite table {table}")
+        for column in SQLITE_INDEXES[table]:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{table}_{column}')} ON {_quote(table)} ({_quote(column)})")
+
+    # Point pets without a shelter_id at the first shelter with their sheltername
+    def _fill_pet_shelters(self, conn):
+        filled = conn.execute(
+            "UPDATE pets SET shelter_id = "
+            "(SELECT shelter_id FROM shelters WHERE shelters.name = pets.sheltername ORDER BY rowid LIMIT 1) "
+            "WHERE shelter_id = '' AND sheltername IN (SELECT name FROM shelters)"
+        ).rowcount
+        if filled:
+            logger.info(f"Linked {filled} pets to their shelter_id")
+
+    def load_tables(self):
+        with closing(self._connect()) as conn:
+            tables = {
+                table: pd.read_sql_query(f"SELECT * FROM {_quote(table)} ORDER BY rowid", conn).fillna("")
+                for table in TABLES
+            }
+        logger.info("Data loaded successfully from SQLite")
+        return tables
+
+    def write_changes(self, changes, frames, snapshot):
+        with self._lock, closing(self._connect()) as conn:
+            with conn:
+                for table in changes.tables():
+                    self._write_table(conn, table, changes, frames[table])
+
+    def _write_table(self, conn, table, changes, frame):
+        key_column = TABLE_KEYS[table]
+        columns = self._columns(conn, table)
+
+        keys = list(changes.updated[table])
+        positions = pd.Index(frame[key_column]).get_indexer(keys)
+        for key, pos in zip(keys, positions):
+            if pos < 0:
+                continue
+            dirty = [col for col in changes.updated[table][key] if col in columns]
+            if not dirty:
+                continue
+            assignments = ", ".join(f"{_quote(col)} = ?" for col in dirty)
+            values = [cell_text(frame.iat[pos, frame.columns.get_loc(col)]) for col in dirty]
+            conn.execute(f"UPDATE {_quote(table)} SET {assignments} WHERE {_quote(key_column)} = ?", values + [key])
+
+        if changes.deleted[table]:
+            conn.executemany(
+                f"DELETE FROM {_quote(table)} WHERE {_quote(key_column)} = ?",
+                [(key,) for key in changes.deleted[table]]
+            )
+
+        if changes.appended[table]:
+            rows = frame[frame[key_column].isin(changes.appended[table])]
+            placeholders = ", ".join("?" for _ in columns)
+            verb = "INSERT OR IGNORE" if table in IDEMPOTENT_TABLES else "INSERT"
+            conn.executemany(
+                f"{verb} INTO {_quote(table)} ({', '.join(_quote(col) for col in columns)}) VALUES ({placeholders})",
+                [[cell_text(row.get(col)) for col in columns] for _, row in rows.iterrows()]
+            )
+        logger.info(f"Wrote changes to SQLite table {table}")
+
+
+# Return the process-wide storage backend selected by the [storage] secrets section.
+# The Drive client lets the Sheets backend skip sheets that have not changed.
+@st.cache_resource
+def get_storage_backend(_gc, _drive_service=None):
+    config = st.secrets.get("storage", {})
+    backend = config.get("backend", "sheets")
+    if backend == "sqlite":
+        return SQLiteBackend(config.get("sqlite_path", DEFAULT_SQLITE_PATH), config.get("seed_dir", BUNDLED_DATA_DIR))
+    if backend != "sheets":
+        logger.warning(f"Unknown storage backend '{backend}', falling back to Google Sheets")
+    return SheetsBackend(_gc, _drive_service)
@@ -0,0 +1,55 @@
+import pandas as pd
+import data_store
+from data_store import DataStore
+from rate_limit import BACKGROUND, INTERACTIVE, background_priority, current_priority
+
+
+def tables(pet_names):
+    return {
+        "pets": pd.DataFrame({"pet_id": ["P1", "P2"], "name": pet_names, "shelter_id": ["S1", "S1"], "sheltername": ["Shelter", "Shelter"]}),
+        "adopters": pd.DataFrame({"adopter_id": ["A1"]}),
+        "shelters": pd.DataFrame({"shelter_id": ["S1"], "name": ["Shelter"]}),
+        "interactions": pd.DataFrame(columns=["interaction_id", "adopter_id", "pet_id", "action", "timestamp"]),
+    }
+
+
+def test_reload_keeps_the_version_until_a_table_changes():
+    loads = [tables(["Max", "Bella"]), tables(["Max", "Bella"]), tables(["Max", "Luna"])]
+    store = DataStore(lambda: loads.pop(0), ttl_seconds=0)
+    first = store.get()
+    unchanged = store.get()
+    assert unchanged.version == first.version
+    assert unchanged.pet_index is first.pet_index
+    assert unchanged.loaded_at > first.loaded_at
+    changed = store.get()
+    assert changed.version == first.version + 1
+    assert list(changed.pets["name"]) == ["Max", "Luna"]
+
+
+# gspread stand-in that records the rate-limit priority each sheet is read at
+class PriorityRecordingClient:
+    def __init__(self):
+        self.priorities = {}
+
+    def open_by_key(self, sheet_id):
+        client = self
+
+        class Worksheet:
+            def get_all_values(self):
+                client.priorities[sheet_id] = current_priority()
+                return [["pet_id"], ["P1"]]
+
+        class Spreadsheet:
+            sheet1 = Worksheet()
+
+        return Spreadsheet()
+
+
+def test_fetch_pool_reads_at_the_callers_priority(monkeypatch):
+    monkeypatch.setattr(data_store, "sheet_ids", lambda: {"pets": "pets-sheet", "shelters": "shelters-sheet"})
+    gc = PriorityRecordingClient()
+    data_store.fetch_tables(gc, ["pets", "shelters"])
+    assert set(gc.priorities.values()) == {INTERACTIVE}
+    with background_priority():
+        data_store.fetch_tables(gc, ["pets", "shelters"])
+    assert gc.priorities == {"pets-sheet": BACKGROUND, "shelters-sheet": BACKGROUND}
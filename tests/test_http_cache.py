@@ -0,0 +1,84 @@
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from http_cache import ConditionalHttpCache
+
+BUNDLED_PETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pets.csv")
+# Nothing listens on the discard port, so every request fails at once
+UNREACHABLE_URL = "http://127.0.0.1:9/pets.csv"
+
+
+def test_bundled_copy_is_only_served_with_a_fallback():
+    cache = ConditionalHttpCache(ttl_seconds=60, timeout=1)
+    with open(BUNDLED_PETS_PATH, "rb") as bundled:
+        expected = bundled.read()
+    assert cache.get(UNREACHABLE_URL, BUNDLED_PETS_PATH) == expected
+    assert UNREACHABLE_URL not in cache
+    with pytest.raises(ConnectionError):
+        cache.get(UNREACHABLE_URL)
+    assert cache.get(UNREACHABLE_URL, BUNDLED_PETS_PATH) == expected
+    assert cache.stats()["fallbacks"] == 1
+
+
+def test_unreachable_url_without_fallback_raises():
+    cache = ConditionalHttpCache(ttl_seconds=60, timeout=1)
+    with pytest.raises(OSError):
+        cache.get(UNREACHABLE_URL)
+    assert UNREACHABLE_URL not in cache
+
+
+# Serves one file at /pets.csv with an ETag of its body, answering a matching If-None-Match with
+# a 304. Tests change server.body to publish a new version; server.requests records each status.
+@pytest.fixture
+def file_server():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            etag = f'"{hashlib.sha1(server.body).hexdigest()}"'
+            if self.headers.get("If-None-Match") == etag:
+                server.requests.append(304)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            server.requests.append(200)
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(server.body)))
+            self.end_headers()
+            self.wfile.write(server.body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.body = b"pet_id,name\nP1,Max\n"
+    server.requests = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/pets.csv"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_expired_body_is_revalidated_then_downloaded_again_once_changed(file_server):
+    cache = ConditionalHttpCache(ttl_seconds=60, timeout=5)
+    assert cache.get(file_server.url) == b"pet_id,name\nP1,Max\n"
+    assert cache.get(file_server.url) == b"pet_id,name\nP1,Max\n"
+    assert file_server.requests == [200]
+
+    cache.ttl_seconds = 0
+    assert cache.get(file_server.url) == b"pet_id,name\nP1,Max\n"
+    assert file_server.requests == [200, 304]
+
+    file_server.body = b"pet_id,name\nP1,Max\nP2,Bella\n"
+    assert cache.get(file_server.url) == b"pet_id,name\nP1,Max\nP2,Bella\n"
+    assert file_server.requests == [200, 304, 200]
+    assert cache.get(file_server.url) == b"pet_id,name\nP1,Max\nP2,Bella\n"
+    assert file_server.requests == [200, 304, 200, 304]
+    assert file_server.url in cache
+    stats = cache.stats()
+    assert (stats["downloads"], stats["revalidations"], stats["fallbacks"]) == (2, 2, 0)
@@ -0,0 +1,41 @@
+import threading
+from image_prefetch import ImagePrefetcher, LRUByteCache
+
+
+# Fetch stand-in that fails every call and counts them
+class FailingFetch:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, url):
+        self.calls += 1
+        raise OSError("connection refused")
+
+
+def test_failed_photo_returns_none_and_is_not_retried_until_the_ttl():
+    fetch = FailingFetch()
+    prefetcher = ImagePrefetcher(lambda image_path: f"http://images/{image_path}", LRUByteCache(1024), fetch=fetch, failure_ttl=60)
+    assert prefetcher.get("P1.jpg") is None
+    assert prefetcher.get("P1.jpg") is None
+    prefetcher.prefetch(["P1.jpg"])
+    assert fetch.calls == 1
+    assert prefetcher.stats()["failures"] == 1
+
+    prefetcher.failure_ttl = 0
+    assert prefetcher.get("P2.jpg") is None
+    assert prefetcher.get("P2.jpg") is None
+    assert fetch.calls == 3
+
+
+def test_slow_photo_returns_none_and_lands_in_the_cache():
+    release = threading.Event()
+
+    def slow_fetch(url):
+        release.wait(5)
+        return b"photo"
+
+    prefetcher = ImagePrefetcher(lambda image_path: image_path, LRUByteCache(1024), fetch=slow_fetch, wait_seconds=0.05)
+    assert prefetcher.get("P1.jpg") is None
+    release.set()
+    prefetcher._submit("P1.jpg").result()
+    assert prefetcher.get("P1.jpg") == b"photo"
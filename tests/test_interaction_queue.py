@@ -0,0 +1,78 @@
+import json
+import time
+import pandas as pd
+from data_store import DataStore
+from interaction_queue import InteractionQueue
+from interactions import interaction_rows
+
+
+# Storage that keeps each table in memory and records the interaction rows it is asked to append
+class MemoryBackend:
+    def __init__(self, interactions_df):
+        self.tables = {
+            "pets": pd.DataFrame({"pet_id": ["P1", "P2"], "shelter_id": ["S1", "S1"], "sheltername": ["Shelter", "Shelter"]}),
+            "adopters": pd.DataFrame({"adopter_id": ["A1"]}),
+            "shelters": pd.DataFrame({"shelter_id": ["S1"], "name": ["Shelter"]}),
+            "interactions": interactions_df,
+        }
+        self.appended = []
+
+    def load_tables(self):
+        return dict(self.tables)
+
+    def write_changes(self, changes, frames, snapshot):
+        rows = frames["interactions"]
+        self.appended.extend(rows[rows["interaction_id"].isin(changes.appended["interactions"])]["interaction_id"])
+
+
+def test_replayed_events_already_stored_are_not_appended_again(tmp_path):
+    flushed = {"adopter_id": "A1", "pet_id": "P1", "action": "like", "timestamp": 1.0}
+    unflushed = {"adopter_id": "A1", "pet_id": "P2", "action": "skip", "timestamp": 2.0}
+    # A crash after flushing the first event but before compacting the journal
+    journal_path = tmp_path / "journal.jsonl"
+    journal_path.write_text("".join(json.dumps(event) + "\n" for event in (flushed, unflushed)), encoding="utf-8")
+    backend = MemoryBackend(interaction_rows([flushed]))
+    store = DataStore(backend.load_tables)
+    queue = InteractionQueue(backend, store, flush_interval_seconds=0.05, journal_path=str(journal_path))
+    store.get()
+    deadline = time.time() + 5
+    while journal_path.read_text(encoding="utf-8") and time.time() < deadline:
+        time.sleep(0.05)
+    assert journal_path.read_text(encoding="utf-8") == ""
+    assert backend.appended == ["A1:skip:P2"]
+    assert sorted(store.get().interactions["interaction_id"]) == ["A1:like:P1", "A1:skip:P2"]
+
+
+def test_enqueue_updates_the_index_and_the_table_after_the_flush(tmp_path):
+    backend = MemoryBackend(interaction_rows([]))
+    store = DataStore(backend.load_tables)
+    queue = InteractionQueue(backend, store, flush_interval_seconds=0.2, journal_path=str(tmp_path / "journal.jsonl"))
+    store.get()
+    queue.enqueue("A1", "P1", "like")
+    queue.enqueue("A1", "P1", "like")
+    assert store.get().interaction_index.liked("A1") == ["P1"]
+    assert store.get().interactions.empty
+    deadline = time.time() + 5
+    while not backend.appended and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.1)
+    assert backend.appended == ["A1:like:P1"]
+    assert list(store.get().interactions["interaction_id"]) == ["A1:like:P1"]
+    assert store.get().interaction_index.liked("A1") == ["P1"]
+
+
+def test_discarded_adopter_events_are_not_written(tmp_path):
+    journal_path = tmp_path / "journal.jsonl"
+    backend = MemoryBackend(interaction_rows([]))
+    store = DataStore(backend.load_tables)
+    queue = InteractionQueue(backend, store, flush_interval_seconds=0.3, journal_path=str(journal_path))
+    store.get()
+    queue.enqueue("A1", "P1", "like")
+    queue.enqueue("A2", "P2", "skip")
+    assert queue.discard_adopter("A1") == 1
+    assert store.get().interaction_index.liked("A1") == []
+    assert "A1" not in journal_path.read_text(encoding="utf-8")
+    deadline = time.time() + 5
+    while not backend.appended and time.time() < deadline:
+        time.sleep(0.05)
+    assert backend.appended == ["A2:skip:P2"]
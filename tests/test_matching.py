@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from matching import calculate_match, score_matrix, score_pets, top_k
+from schema import apply_schema
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_table(table):
+    return pd.read_csv(os.path.join(DATA_DIR, f"{table}.csv"), dtype=str, keep_default_na=False)
+
+
+# Pets and adopters covering missing values, empty strings, unknown categories and special needs
+def edge_frames():
+    pets = pd.DataFrame({
+        "pet_id": ["P1", "P2", "P3", "P4", "P5", "P6"],
+        "species": ["Dog", "Cat", None, "", "Dog", "Parrot"],
+        "gender": ["Male", "Female", None, "", "Male", "Female"],
+        "activity_level": ["High", "Low", None, "", "Medium", "Extreme"],
+        "allergy_friendly": ["Yes", "No", None, "", "Yes", "Yes"],
+        "special_needs": ["", "Diabetes", None, "", "Blind", ""],
+    })
+    adopters = pd.DataFrame({
+        "adopter_id": ["A1", "A2", "A3", "A4", "A5"],
+        "pref_species": ["Dog", "Cat", "", None, "Parrot"],
+        "pref_gender": ["Any", "Female", "", None, "Male"],
+        "activity_level": ["High", "Low", "", None, "Medium"],
+        "allergy_friendly": ["Yes", "No", "", None, "Yes"],
+        "house": ["No", "Yes", "", None, "No"],
+        "garden": ["No", "No", "", None, "Yes"],
+        "apartment_size": ["30", "", "", None, "80"],
+    })
+    return pets, adopters
+
+
+def typed(pets, adopters):
+    return apply_schema("pets", pets), apply_schema("adopters", adopters)
+
+
+def categorical(pets, adopters):
+    pets, adopters = pets.copy(), adopters.copy()
+    for column in ["species", "gender", "activity_level"]:
+        pets[column] = pets[column].astype("category")
+    for column in ["pref_species", "pref_gender", "activity_level"]:
+        adopters[column] = adopters[column].astype("category")
+    return pets, adopters
+
+
+def bundled():
+    return read_table("pets"), read_table("adopters")
+
+
+def bundled_typed():
+    return typed(*bundled())
+
+
+def edge_typed():
+    return typed(*edge_frames())
+
+
+def edge_categorical():
+    return categorical(*edge_frames())
+
+
+FRAMES = [bundled, bundled_typed, edge_frames, edge_typed, edge_categorical]
+
+
+def reference(pets, adopter):
+    return np.array([calculate_match(adopter, pet) for _, pet in pets.iterrows()], dtype=np.float64)
+
+
+@pytest.mark.parametrize("frames", FRAMES, ids=lambda frames: frames.__name__)
+def test_score_pets_matches_calculate_match(frames):
+    pets, adopters = frames()
+    for _, adopter in adopters.iterrows():
+        np.testing.assert_array_equal(score_pets(adopter, pets), reference(pets, adopter))
+
+
+@pytest.mark.parametrize("frames", FRAMES, ids=lambda frames: frames.__name__)
+def test_score_matrix_matches_calculate_match(frames):
+    pets, adopters = frames()
+    matrix = score_matrix(pets, adopters)
+    assert matrix.shape == (len(pets), len(adopters))
+    for column, (_, adopter) in enumerate(adopters.iterrows()):
+        np.testing.assert_array_equal(matrix[:, column], reference(pets, adopter))
+
+
+def test_scores_without_special_needs_column():
+    pets, adopters = edge_frames()
+    pets = pets.drop(columns="special_needs")
+    for column, (_, adopter) in enumerate(adopters.iterrows()):
+        expected = reference(pets, adopter)
+        np.testing.assert_array_equal(score_pets(adopter, pets), expected)
+        np.testing.assert_array_equal(score_matrix(pets, adopters)[:, column], expected)
+
+
+def test_empty_frames():
+    pets, adopters = edge_frames()
+    assert len(score_pets(adopters.iloc[0], pets.iloc[:0])) == 0
+    assert score_matrix(pets.iloc[:0], adopters).shape == (0, len(adopters))
+    assert score_matrix(pets, adopters.iloc[:0]).shape == (len(pets), 0)
+
+
+@pytest.mark.parametrize("k", [None, 0, 1, 3, 5, 8, 20])
+def test_top_k_keeps_stable_order_for_ties(k):
+    rng = np.random.default_rng(0)
+    scores = rng.choice([0.2, 0.5, 0.7, 1.0], size=50)
+    expected = np.argsort(-scores, kind="stable")
+    expected = expected if k is None else expected[:k]
+    np.testing.assert_array_equal(top_k(scores, k), expected)
@@ -0,0 +1,40 @@
+import io
+import zipfile
+import pandas as pd
+from PIL import Image
+from pet_import import validate_import, zip_photos
+
+CSV = (
+    "species,breed,gender,name,activity_level,age,allergy_friendly,image_path\n"
+    "Dog,Labrador,Male,Rex,High,3,Yes,rex.jpg\n"
+    "Cat,Siamese,Female,Tom,Low,2,No,\n"
+)
+
+
+def rows():
+    return pd.read_csv(io.StringIO(CSV), dtype=str, keep_default_na=False)
+
+
+def photo_zip(names):
+    photo = io.BytesIO()
+    Image.new("RGB", (10, 10), "red").save(photo, "JPEG")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as photos:
+        for name in names:
+            photos.writestr(name, photo.getvalue())
+    return zipfile.ZipFile(buffer)
+
+
+def test_without_a_zip_image_path_is_kept():
+    new_pets, results = validate_import(rows(), "S1", "Shelter", ["PET000000"])
+    assert [result.status for result in results] == ["ready", "ready"]
+    assert list(new_pets["image_path"]) == ["rex.jpg", ""]
+
+
+def test_with_a_zip_photos_must_be_in_it():
+    new_pets, results = validate_import(rows(), "S1", "Shelter", ["PET000000"], zip_photos(photo_zip(["other.jpg"])))
+    assert [result.status for result in results] == ["failed", "ready"]
+    assert results[0].message == "photo rex.jpg is not in the zip"
+    new_pets, results = validate_import(rows(), "S1", "Shelter", ["PET000000"], zip_photos(photo_zip(["photos/rex.jpg"])))
+    assert [result.status for result in results] == ["ready", "ready"]
+    assert list(new_pets["shelter_id"]) == ["S1", "S1"]
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from indexes import PetAttributeIndex
+from matching import calculate_match
+from recommendations import Ranking
+from schema import apply_schema
+
+PET_VALUES = {
+    "species": ["Dog", "Cat", "Rabbit", None],
+    "gender": ["Male", "Female", None],
+    "activity_level": ["High", "Medium", "Low", None],
+    "allergy_friendly": ["Yes", "No", None],
+    "special_needs": ["", "", "Diabetes", None],
+}
+ADOPTER_VALUES = {
+    "pref_species": ["Dog", "Cat", "Rabbit", None],
+    "pref_gender": ["Male", "Female", "Any", None],
+    "activity_level": ["High", "Medium", "Low", None],
+    "allergy_friendly": ["Yes", "No", None],
+    "house": ["Yes", "No"],
+    "garden": ["Yes", "No"],
+    "apartment_size": ["20", "60", None],
+}
+
+
+def random_frame(values, n, key, rng):
+    frame = pd.DataFrame({column: rng.choice(np.array(choices, dtype=object), n) for column, choices in values.items()})
+    frame.insert(0, key, [f"{key[0].upper()}{i}" for i in range(n)])
+    return frame
+
+
+# Random pets and adopters with missing values, as text cells with NaN and as typed frames
+def random_tables(typed, seed=7, pets=200, adopters=40):
+    rng = np.random.default_rng(seed)
+    pets_df = random_frame(PET_VALUES, pets, "pet_id", rng)
+    adopters_df = random_frame(ADOPTER_VALUES, adopters, "adopter_id", rng)
+    if typed:
+        return apply_schema("pets", pets_df), apply_schema("adopters", adopters_df)
+    return pets_df.fillna(np.nan), adopters_df.fillna(np.nan)
+
+
+# Pet ids in the order calculate_match ranks them, ties in catalog order
+def brute_force(adopter, pets_df):
+    scores = np.array([calculate_match(adopter, pet) for _, pet in pets_df.iterrows()])
+    return list(pets_df["pet_id"].iloc[np.argsort(-scores, kind="stable")])
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_ranking_pages_match_calculate_match(typed):
+    pets_df, adopters_df = random_tables(typed)
+    index = PetAttributeIndex.build(pets_df)
+    for _, adopter in adopters_df.iterrows():
+        ranking = Ranking(adopter)
+        pages = []
+        while True:
+            page = ranking.page(index, frozenset(pages), limit=7)
+            if not page:
+                break
+            pages.extend(page)
+        assert pages == brute_force(adopter, pets_df), adopter["adopter_id"]
+
+
+def test_ranking_follows_edited_pets():
+    pets_df, adopters_df = random_tables(typed=True, pets=60, adopters=10)
+    index = PetAttributeIndex.build(pets_df)
+    rankings = [Ranking(adopter) for _, adopter in adopters_df.iterrows()]
+    for ranking in rankings:
+        ranking.page(index, frozenset(), limit=20)
+    edited = pets_df.copy()
+    edited.loc[edited.index[::3], "gender"] = np.nan
+    for pos in edited.index[::3]:
+        pet = edited.loc[pos]
+        index.put(pet)
+        for ranking in rankings:
+            ranking.place(pet["pet_id"], (-calculate_match(ranking.adopter, pet), index.seq(pet["pet_id"])))
+    for ranking in rankings:
+        ranking.cursor = 0
+        assert ranking.page(index, frozenset(), limit=len(edited)) == brute_force(ranking.adopter, edited)